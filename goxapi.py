@@ -31,29 +31,41 @@ from ConfigParser import SafeConfigParser
 import base64
 import bisect
 import binascii
+import collections
 import contextlib
 from Crypto.Cipher import AES
 import getpass
-import gzip
 import hashlib
 import hmac
+import httplib
 import inspect
-import io
 import json
 import logging
 import pubnub_light
 import Queue
+import re
+import select
+import socket
 import time
 import traceback
 import threading
 from urllib2 import Request as URLRequest
 from urllib2 import urlopen, HTTPError
-from urllib import urlencode
+from urllib import getproxies, urlencode
+import urlparse
 import weakref
 import websocket
+import zlib
 
 input = raw_input  # pylint: disable=W0622,C0103
 
+# ujson is optional, it decodes the incoming messages a lot faster
+try:
+    import ujson  # pylint: disable=F0401
+    json_loads = ujson.loads  # pylint: disable=C0103
+except ImportError:
+    json_loads = json.loads  # pylint: disable=C0103
+
 FORCE_PROTOCOL = ""
 FORCE_NO_FULLDEPTH = False
 FORCE_NO_DEPTH = False
@@ -67,6 +79,12 @@ WEBSOCKET_HOST = "websocket.mtgox.com"
 HTTP_HOST = "data.mtgox.com"
 
 USER_AGENT = "goxtool.py"
+HTTP_TIMEOUT = 30 # seconds, for every blocking operation on a http socket
+
+STR_CACHE_SIZE = 10000 # max entries in the base2str() and quote2str() caches
+RECV_QUEUE_SIZE = 4096 # max received messages waiting to be processed
+SOCKET_RCVBUF = 1 << 20 # receive buffer size for the streaming sockets
+WEBSOCKET_PING_INTERVAL = 20 # seconds, well below the 60 s receive timeout
 
 # available channels as per https://mtgox.com/api/2/stream/list_public?pretty
 # queried on 2013-12-14 - this must be updated when they add new currencies,
@@ -169,6 +187,57 @@ def float2int(value_float, currency):
         return int(round(value_float * 100000))
 
 
+# kept-alive HTTP connections, per thread and keyed by (scheme, host)
+HTTP_CONNECTIONS = threading.local()
+
+def http_keepalive_request(scheme, host, path, post, headers):
+    """send the request over a persistent connection to this host, open a
+    new one if there is none yet. If a reused connection turns out to have
+    been closed by the server in the meantime it will be reopened and the
+    request is sent once more, but only if it is certain that the server
+    did not process it already. Returns a tuple (content-encoding, body)"""
+    if not hasattr(HTTP_CONNECTIONS, "pool"):
+        HTTP_CONNECTIONS.pool = {}
+    pool = HTTP_CONNECTIONS.pool
+    key = (scheme, host)
+    while True:
+        conn = pool.pop(key, None)
+        if conn is not None and conn.sock is not None:
+            # an idle connection must not have anything to read, if it
+            # has then the server has closed it (or sent garbage)
+            if select.select([conn.sock], [], [], 0)[0]:
+                conn.close()
+                conn = None
+        reused = conn is not None
+        if not reused:
+            if scheme == "https":
+                conn = httplib.HTTPSConnection(host, timeout=HTTP_TIMEOUT)
+            else:
+                conn = httplib.HTTPConnection(host, timeout=HTTP_TIMEOUT)
+        sent = False
+        try:
+            conn.request("POST" if post is not None else "GET",
+                path, post, headers)
+            sent = True
+            response = conn.getresponse()
+            encoding = response.getheader("Content-Encoding")
+            data = response.read()
+        except (httplib.HTTPException, socket.error) as exc:
+            conn.close()
+            # Try again on a new connection only if the request did not go
+            # out at all or if it was a GET that got no status line back.
+            # A POST that has been sent might have been processed, sending
+            # it again would reuse its nonce and turn a success into an error.
+            if reused and (not sent or (post is None
+                    and isinstance(exc, httplib.BadStatusLine))):
+                continue
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            pool[key] = conn
+        return encoding, data
+
 def http_request(url, post=None, headers=None):
     """request data from the HTTP API, returns the response a string. If a
     http error occurs it will *not* raise an exception, instead it will
@@ -176,32 +245,38 @@ def http_request(url, post=None, headers=None):
     send 5xx http status codes even if application level errors occur
     (such as canceling the same order twice or things like that) and the
     real error message will be in the json that is returned, so the return
-    document is always much more interesting than the http status code."""
-
-    def read_gzipped(response):
-        """read data from the response object,
-        unzip if necessary, return text string"""
-        if response.info().get('Content-Encoding') == 'gzip':
-            with io.BytesIO(response.read()) as buf:
-                with gzip.GzipFile(fileobj=buf) as unzipped:
-                    data = unzipped.read()
-        else:
-            data = response.read()
+    document is always much more interesting than the http status code.
+    Connections are kept alive and reused unless a proxy is configured."""
+
+    def unzip(encoding, data):
+        """unzip the data if necessary, return text string"""
+        if encoding == 'gzip':
+            # wbits 16 + MAX_WBITS makes zlib expect the gzip header
+            data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
         return data
 
-    if not headers:
-        headers = {}
+    headers = dict(headers) if headers else {}
+    headers['Accept-encoding'] = 'gzip'
+    headers['User-Agent'] = USER_AGENT
+    if post is not None:
+        # urllib2 used to add this on its own, httplib does not
+        headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+
+    parts = urlparse.urlsplit(url)
+    if parts.scheme not in getproxies():
+        path = parts.path
+        if parts.query:
+            path += "?" + parts.query
+        return unzip(*http_keepalive_request(
+            parts.scheme, parts.netloc, path, post, headers))
+
+    # urllib2 knows how to talk to proxies, so let it handle this one
     request = URLRequest(url, post, headers)
-    request.add_header('Accept-encoding', 'gzip')
-    request.add_header('User-Agent', USER_AGENT)
-    data = ""
     try:
-        with contextlib.closing(urlopen(request, post)) as res:
-            data = read_gzipped(res)
+        with contextlib.closing(urlopen(request, post, HTTP_TIMEOUT)) as res:
+            return unzip(res.info().get('Content-Encoding'), res.read())
     except HTTPError as err:
-        data = read_gzipped(err)
-
-    return data
+        return unzip(err.info().get('Content-Encoding'), err.read())
 
 def start_thread(thread_func, name=None):
     """start a new thread to execute the supplied function"""
@@ -241,11 +316,15 @@ class GoxConfig(SafeConfigParser):
                 ,["gox", "load_fulldepth", "True"]
                 ,["gox", "load_history", "True"]
                 ,["gox", "history_timeframe", "15"]
+                ,["gox", "debug_market_data", "True"]
                 ,["gox", "secret_key", ""]
                 ,["gox", "secret_secret", ""]
                 ,["pubnub", "stream_sorter_time_window", "0.5"]
                 ]
 
+    # the same as above as a dict {(sect, opt): default} for get_safe()
+    _DEFAULTS_DICT = {(sect, opt): dflt for (sect, opt, dflt) in _DEFAULTS}
+
     def __init__(self, filename):
         self.filename = filename
         SafeConfigParser.__init__(self)
@@ -260,8 +339,12 @@ class GoxConfig(SafeConfigParser):
 
     def init_defaults(self, defaults):
         """add the missing default values, default is a list of defaults"""
+        added = False
         for (sect, opt, default) in defaults:
-            self._default(sect, opt, default)
+            if self._default(sect, opt, default, False):
+                added = True
+        if added:
+            self.save()
 
     def save(self):
         """save the config to the .ini file"""
@@ -278,11 +361,11 @@ class GoxConfig(SafeConfigParser):
             return self.get(sect, opt)
 
         except: # pylint: disable=W0702
-            for (dsect, dopt, default) in self._DEFAULTS:
-                if dsect == sect and dopt == opt:
-                    self._default(sect, opt, default)
-                    return default
-            return ""
+            default = self._DEFAULTS_DICT.get((sect, opt))
+            if default is None:
+                return ""
+            self._default(sect, opt, default)
+            return default
 
     def get_bool(self, sect, opt):
         """get boolean value from config"""
@@ -308,13 +391,18 @@ class GoxConfig(SafeConfigParser):
         except ValueError:
             return 0.0
 
-    def _default(self, section, option, default):
-        """create a default option if it does not yet exist"""
+    def _default(self, section, option, default, save=True):
+        """create a default option if it does not yet exist, returns True if
+        it has been created. Use save=False when adding many defaults at
+        once and then save only once after all of them have been added."""
         if not self.has_section(section):
             self.add_section(section)
         if not self.has_option(section, option):
             self.set(section, option, default)
-            self.save()
+            if save:
+                self.save()
+            return True
+        return False
 
 class Signal():
     """callback functions (so called slots) can be connected to a signal and
@@ -326,11 +414,13 @@ class Signal():
     thread to avoid deadlocks when a slot wants to send a signal itself."""
 
     _lock = threading.RLock()
+    _slots_lock = threading.Lock() # guards building and clearing _slots
     signal_error = None
 
     def __init__(self):
         self._functions = weakref.WeakSet()
         self._methods = weakref.WeakKeyDictionary()
+        self._slots = None # flat list of (weakref, func), see _get_slots()
 
         # the Signal class itself has a static member signal_error where it
         # will send tracebacks of exceptions that might happen. Here we
@@ -346,16 +436,33 @@ class Signal():
         is a reference to the sender of the signal and the second argument is
         the payload. The payload can be anything, it totally depends on the
         sender and type of the signal."""
-        if inspect.ismethod(slot):
-            instance = slot.__self__
-            function = slot.__func__
-            if instance not in self._methods:
-                self._methods[instance] = set()
-            if function not in self._methods[instance]:
-                self._methods[instance].add(function)
-        else:
-            if slot not in self._functions:
+        with self._slots_lock:
+            if inspect.ismethod(slot):
+                self._methods.setdefault(slot.__self__, set()).add(slot.__func__)
+            else:
                 self._functions.add(slot)
+            self._slots = None
+
+    def _get_slots(self):
+        """return a flat list of (weakref, func) tuples for all connected
+        slots. func is None for plain functions, for methods it is the
+        unbound function and weakref points to the instance. The list is
+        cached and only rebuilt after connect() or after a dead reference
+        has been found while sending, so emitting a signal does not need
+        to iterate the WeakSet and the WeakKeyDictionary every time.
+        Building happens under _slots_lock so that a connect() from another
+        thread can not be overwritten with a list that is already stale."""
+        slots = self._slots
+        if slots is None:
+            with self._slots_lock:
+                slots = self._slots
+                if slots is None:
+                    slots = [(weakref.ref(func), None) for func in self._functions]
+                    for instance, functions in self._methods.items():
+                        ref = weakref.ref(instance)
+                        slots.extend((ref, func) for func in functions)
+                    self._slots = slots
+        return slots
 
     def __call__(self, sender, data, error_signal_on_error=True):
         """dispatch signal to all connected slots. This is a synchronuos
@@ -368,26 +475,37 @@ class Signal():
         signals can be directly connected to other signals) without problems.
         If a slot raises an exception a traceback will be sent to the static
         Signal.signal_error() or to logging.critical()"""
+
+        # Nothing connected, no need to wait for the lock. The lock itself
+        # must stay, the application relies on it: it is what keeps the
+        # UI from painting the orderbook while a slot is modifying it.
+        slots = self._get_slots()
+        if not slots:
+            return False
+
         with self._lock:
             sent = False
             errors = []
-            for func in self._functions:
+            for ref, func in slots:
+                target = ref()
+                if target is None:
+                    # garbage collected, rebuild the list next time
+                    self._slots = None
+                    continue
                 try:
-                    func(sender, data)
+                    if func is None:
+                        target(sender, data)
+                    else:
+                        func(target, sender, data)
                     sent = True
 
+                except KeyboardInterrupt:
+                    # not an error in the slot, let Ctrl+C reach the main loop
+                    raise
+
                 except: # pylint: disable=W0702
                     errors.append(traceback.format_exc())
 
-            for instance, functions in self._methods.items():
-                for func in functions:
-                    try:
-                        func(instance, sender, data)
-                        sent = True
-
-                    except: # pylint: disable=W0702
-                        errors.append(traceback.format_exc())
-
             for error in errors:
                 if error_signal_on_error:
                     Signal.signal_error(self, (error), False)
@@ -408,8 +526,14 @@ class BaseObject():
         """send a string composed of all *args to all slots who
         are connected to signal_debug or send it to the logger if
         nobody is connected"""
+        # don't even build the message if nobody would ever see it
+        signal = self.signal_debug
+        # pylint: disable=W0212
+        if not (signal._functions or signal._methods
+                or logging.root.isEnabledFor(logging.DEBUG)):
+            return
         msg = " ".join([str(x) for x in args])
-        if not self.signal_debug(self, (msg)):
+        if not signal(self, (msg)):
             logging.debug(msg)
 
 
@@ -463,6 +587,13 @@ class Secret:
         self.key = ""
         self.secret = ""
 
+        # the same in binary form, as needed for signing requests
+        self.key_bin = ""
+        self.secret_bin = ""
+
+        # HMAC keyed with secret_bin, copied for every signature, see sign()
+        self.hmac_template = None
+
         # pylint: disable=C0103
         self.password_from_commandline_option = None
 
@@ -504,12 +635,19 @@ class Secret:
                 raise Exception("key has wrong size")
 
             print("ok :-)")
+            self.key_bin = binascii.unhexlify(hex_key)
+            self.secret_bin = base64.b64decode(self.secret)
+            # pylint: disable=E1101
+            self.hmac_template = hmac.new(self.secret_bin, "", hashlib.sha512)
             return self.S_OK
 
         except Exception as exc:
             # this key and secret do not work :-(
             self.secret = ""
             self.key = ""
+            self.secret_bin = ""
+            self.key_bin = ""
+            self.hmac_template = None
             print("### Error occurred while testing the decrypted secret:")
             print("    '%s'" % exc)
             print("    This does not seem to be a valid MtGox API secret")
@@ -589,11 +727,21 @@ class Secret:
         without secret and then just don't do any account related stuff"""
         return(self.secret != "") and (self.key != "")
 
+    def sign(self, data):
+        """return the HMAC-SHA512 signature of data. This copies the already
+        keyed template instead of hashing the key pads again for every call"""
+        mac = self.hmac_template.copy()
+        mac.update(data)
+        return mac.digest()
+
 
-class OHLCV():
+class OHLCV(object):
     """represents a chart candle. tim is POSIX timestamp of open time,
     prices and volume are integers like in the other parts of the gox API"""
 
+    # there can be many thousands of these, don't give each one a __dict__
+    __slots__ = ("tim", "opn", "hig", "low", "cls", "vol")
+
     def __init__(self, tim, opn, hig, low, cls, vol):
         self.tim = tim
         self.opn = opn
@@ -606,7 +754,7 @@ class OHLCV():
         """update high, low and close values and add to volume"""
         if price > self.hig:
             self.hig = price
-        if price < self.low:
+        elif price < self.low:
             self.low = price
         self.cls = price
         self.vol += volume
@@ -622,7 +770,7 @@ class History(BaseObject):
         self.signal_changed               = Signal()
 
         self.gox = gox
-        self.candles = []
+        self.candles = collections.deque()
         self.timeframe = timeframe
 
         self.ready_history = False
@@ -639,7 +787,7 @@ class History(BaseObject):
         """slot for gox.signal_trade"""
         (date, price, volume, dummy_typ, own) = data
         if not own:
-            time_round = int(date / self.timeframe) * self.timeframe
+            time_round = date - date % self.timeframe
             candle = self.last_candle()
             if candle:
                 if candle.tim == time_round:
@@ -655,7 +803,7 @@ class History(BaseObject):
 
     def _add_candle(self, candle):
         """add a new candle to the history but don't fire signal_changed"""
-        self.candles.insert(0, candle)
+        self.candles.appendleft(candle)
 
     def slot_fullhistory(self, dummy_sender, data):
         """process the result of the fullhistory request"""
@@ -665,32 +813,41 @@ class History(BaseObject):
             self.debug("### history download was empty")
             return
 
-        def get_time_round(date):
-            """round timestamp to current candle timeframe"""
-            return int(date / self.timeframe) * self.timeframe
+        timeframe = self.timeframe
 
         #remove existing recent candle(s) if any, we will create them fresh
-        date_begin = get_time_round(int(history[0]["date"]))
+        date_begin = int(history[0]["date"])
+        date_begin -= date_begin % timeframe
         while len(self.candles) and self.candles[0].tim >= date_begin:
-            self.candles.pop(0)
+            self.candles.popleft()
 
-        new_candle = OHLCV(0, 0, 0, 0, 0, 0) #this is a dummy, not actually inserted
+        # accumulate the candle in local variables and only create an
+        # OHLCV object when the candle is complete, there can be many
+        # thousand trades but only a few hundred candles.
+        add_candle = self._add_candle
+        tim = opn = hig = low = cls = vol = 0
         count_added = 0
         for trade in history:
             date = int(trade["date"])
             price = int(trade["price_int"])
             volume = int(trade["amount_int"])
-            time_round = get_time_round(date)
-            if time_round > new_candle.tim:
-                if new_candle.tim > 0:
-                    self._add_candle(new_candle)
+            time_round = date - date % timeframe
+            if time_round > tim:
+                if tim > 0:
+                    add_candle(OHLCV(tim, opn, hig, low, cls, vol))
                     count_added += 1
-                new_candle = OHLCV(
-                    time_round, price, price, price, price, volume)
-            new_candle.update(price, volume)
+                tim = time_round
+                opn = hig = low = price
+                vol = volume
+            elif price > hig:
+                hig = price
+            elif price < low:
+                low = price
+            cls = price
+            vol += volume
 
         # insert current (incomplete) candle
-        self._add_candle(new_candle)
+        add_candle(OHLCV(tim, opn, hig, low, cls, vol))
         count_added += 1
         self.debug("### got %d updated candle(s)" % count_added)
         self.ready_history = True
@@ -715,6 +872,19 @@ class BaseClient(BaseObject):
     _last_unique_microtime = 0
     _nonce_lock = threading.Lock()
 
+    # subscribe requests for the channels that are the same for all currencies
+    _SUBSCRIBE_TRADES = json.dumps({"op":"mtgox.subscribe", "type":"trades"})
+    _SUBSCRIBE_LAG = json.dumps({"op":"mtgox.subscribe", "type":"lag"})
+
+    # subscribe requests with a variable part. Channel names are built from
+    # currency codes and need no escaping, the idkey is escaped by the caller
+    _SUBSCRIBE_CHANNEL = '{"op": "mtgox.subscribe", "channel": "%s"}'
+    _SUBSCRIBE_KEY = '{"op": "mtgox.subscribe", "key": %s}'
+
+    # envelope for send_signed_call(), base64 needs no json escaping
+    _CALL_TEMPLATE = '{"op": "call", "call": "%s", "id": %s, ' \
+                     '"context": "mtgox.com"}'
+
     def __init__(self, curr_base, curr_quote, secret, config):
         BaseObject.__init__(self)
 
@@ -738,9 +908,13 @@ class BaseClient(BaseObject):
         self.config = config
         self.socket = None
         self.http_requests = Queue.Queue()
+        self.recv_queue = Queue.Queue(RECV_QUEUE_SIZE)
+        self.download_requests = Queue.Queue()
 
         self._recv_thread = None
+        self._dispatch_thread = None
         self._http_thread = None
+        self._download_thread = None
         self._terminating = False
         self.connected = False
         self._time_last_received = 0
@@ -750,12 +924,19 @@ class BaseClient(BaseObject):
     def start(self):
         """start the client"""
         self._recv_thread = start_thread(self._recv_thread_func, "socket receive thread")
+        self._dispatch_thread = start_thread(self._dispatch_thread_func, "socket dispatch thread")
         self._http_thread = start_thread(self._http_thread_func, "http thread")
+        self._download_thread = start_thread(self._download_thread_func, "http download thread")
 
     def stop(self):
         """stop the client"""
         self._terminating = True
         self._timer.cancel()
+        try:
+            self.recv_queue.put_nowait(None)
+        except Queue.Full:
+            pass
+        self.download_requests.put(None)
         if self.socket:
             self.debug("### closing socket")
             self.socket.sock.close()
@@ -764,11 +945,11 @@ class BaseClient(BaseObject):
         """force client to reconnect"""
         self.socket.close()
 
-    def _try_send_raw(self, raw_data):
+    def _try_send_raw(self, raw_data, opcode=websocket.ABNF.OPCODE_TEXT):
         """send raw data to the websocket or disconnect and close"""
         if self.connected:
             try:
-                self.socket.send(raw_data)
+                self.socket.send(raw_data, opcode)
             except Exception as exc:
                 self.debug(exc)
                 self.connected = False
@@ -779,13 +960,13 @@ class BaseClient(BaseObject):
         websocket. Each client class will override this send method"""
         raise NotImplementedError()
 
-    def get_unique_mirotime(self):
+    @classmethod
+    def get_unique_mirotime(cls):
         """produce a unique nonce that is guaranteed to be ever increasing"""
-        with self._nonce_lock:
-            microtime = int(time.time() * 1E6)
-            if microtime <= self._last_unique_microtime:
-                microtime = self._last_unique_microtime + 1
-            self._last_unique_microtime = microtime
+        with cls._nonce_lock:
+            microtime = max(int(time.time() * 1E6),
+                cls._last_unique_microtime + 1)
+            cls._last_unique_microtime = microtime
             return microtime
 
     def use_http(self):
@@ -806,12 +987,12 @@ class BaseClient(BaseObject):
         return self.config.get_bool("gox", "use_tonce")
 
     def request_fulldepth(self):
-        """start the fulldepth thread"""
+        """queue the fulldepth download"""
 
         def fulldepth_thread():
-            """request the full market depth, initialize the order book
-            and then terminate. This is called in a separate thread after
-            the streaming API has been connected."""
+            """request the full market depth and initialize the order book.
+            This is called in the download thread after the streaming API
+            has been connected."""
             self.debug("### requesting initial full depth")
             use_ssl = self.config.get_bool("gox", "use_ssl")
             proto = {True: "https", False: "http"}[use_ssl]
@@ -821,9 +1002,9 @@ class BaseClient(BaseObject):
                 self.curr_base,
                 self.curr_quote
             ))
-            self.signal_fulldepth(self, (json.loads(fulldepth)))
+            self.signal_fulldepth(self, (json_loads(fulldepth)))
 
-        start_thread(fulldepth_thread, "http request full depth")
+        self.download_requests.put(fulldepth_thread)
 
     def request_history(self):
         """request trading history"""
@@ -853,17 +1034,45 @@ class BaseClient(BaseObject):
                 self.curr_quote,
                 querystring
             ))
-            history = json.loads(json_hist)
+            history = json_loads(json_hist)
             if history["result"] == "success":
                 self.signal_fullhistory(self, history["data"])
 
-        start_thread(history_thread, "http request trade history")
+        self.download_requests.put(history_thread)
 
     def _recv_thread_func(self):
         """this will be executed as the main receiving thread, each type of
-        client (websocket or socketio) will implement its own"""
+        client (websocket or socketio) will implement its own. Received json
+        strings should be put into self.recv_queue, not be dispatched in
+        the receiving thread, see _dispatch_thread_func()"""
         raise NotImplementedError()
 
+    def _dispatch_thread_func(self):
+        """take the received json strings out of the recv_queue and dispatch
+        them with signal_recv. This is done in its own thread so the socket
+        will still be read while the slots are busy processing a message,
+        during bursts of messages they will wait in the queue instead of
+        in the socket buffers. None in the queue will end the thread."""
+        while not self._terminating:
+            str_json = self.recv_queue.get()
+            if str_json is None:
+                break
+            self.signal_recv(self, (str_json))
+
+    def _download_thread_func(self):
+        """run the queued fulldepth and history downloads one after the other.
+        This thread lives as long as the client, so reconnecting does not
+        start new threads and the http connection can be reused. None in the
+        queue will end the thread."""
+        while not self._terminating:
+            download_func = self.download_requests.get()
+            if download_func is None:
+                break
+            try:
+                download_func()
+            except Exception as exc:
+                self.debug("### download failed:", exc.__class__.__name__, exc)
+
     def channel_subscribe(self, download_market_data=True):
         """subscribe to needed channnels and download initial data (orders,
         account info, depth, history, etc. Some of these might be redundant but
@@ -873,13 +1082,13 @@ class BaseClient(BaseObject):
 
         symb = "%s%s" % (self.curr_base, self.curr_quote)
         if not FORCE_NO_DEPTH:
-            self.send(json.dumps({"op":"mtgox.subscribe", "channel":"depth.%s" % symb}))
-        self.send(json.dumps({"op":"mtgox.subscribe", "channel":"ticker.%s" % symb}))
+            self.send(self._SUBSCRIBE_CHANNEL % ("depth." + symb))
+        self.send(self._SUBSCRIBE_CHANNEL % ("ticker." + symb))
 
         # trades and lag are the same channels for all currencies
-        self.send(json.dumps({"op":"mtgox.subscribe", "type":"trades"}))
+        self.send(self._SUBSCRIBE_TRADES)
         if not FORCE_NO_LAG:
-            self.send(json.dumps({"op":"mtgox.subscribe", "type":"lag"}))
+            self.send(self._SUBSCRIBE_LAG)
 
         self.request_idkey()
         self.request_orders()
@@ -985,7 +1194,7 @@ class BaseClient(BaseObject):
                 self.enqueue_http_request(api_endpoint, params, reqid)
 
             if translated:
-                self.signal_recv(self, (json.dumps(translated)))
+                self.signal_recv(self, (translated))
 
             self.http_requests.task_done()
 
@@ -1002,7 +1211,6 @@ class BaseClient(BaseObject):
             return
 
         key = self.secret.key
-        sec = self.secret.secret
 
         if self.use_tonce():
             params["tonce"] = self.get_unique_mirotime()
@@ -1011,8 +1219,7 @@ class BaseClient(BaseObject):
 
         post = urlencode(params)
         prefix = api_endpoint + chr(0)
-        # pylint: disable=E1101
-        sign = hmac.new(base64.b64decode(sec), prefix + post, hashlib.sha512).digest()
+        sign = self.secret.sign(prefix + post)
 
         headers = {
             'Rest-Key': key,
@@ -1027,7 +1234,7 @@ class BaseClient(BaseObject):
             api_endpoint
         )
         self.debug("### (%s) calling %s" % (proto, url))
-        return json.loads(http_request(url, post, headers))
+        return json_loads(http_request(url, post, headers))
 
     def send_signed_call(self, api_endpoint, params, reqid):
         """send a signed (authenticated) API call over the socket.io.
@@ -1037,8 +1244,7 @@ class BaseClient(BaseObject):
             self.debug("### don't know secret, cannot call %s" % api_endpoint)
             return
 
-        key = self.secret.key
-        sec = self.secret.secret
+        key = self.secret.key_bin
 
         call = {
             "id"       : reqid,
@@ -1053,17 +1259,14 @@ class BaseClient(BaseObject):
             call["nonce"] = self.get_unique_mirotime()
         call = json.dumps(call)
 
-        # pylint: disable=E1101
-        sign = hmac.new(base64.b64decode(sec), call, hashlib.sha512).digest()
-        signedcall = key.replace("-", "").decode("hex") + sign + call
+        sign = self.secret.sign(call)
+        signedcall = key + sign + call
 
         self.debug("### (socket) calling %s" % api_endpoint)
-        self.send(json.dumps({
-            "op"      : "call",
-            "call"    : base64.b64encode(signedcall),
-            "id"      : reqid,
-            "context" : "mtgox.com"
-        }))
+        self.send(self._CALL_TEMPLATE % (
+            base64.b64encode(signedcall),
+            json.dumps(reqid)
+        ))
 
     def send_order_add(self, typ, price, volume):
         """send an order"""
@@ -1093,7 +1296,7 @@ class BaseClient(BaseObject):
 
     def on_idkey_received(self, data):
         """id key was received, subscribe to private channel"""
-        self.send(json.dumps({"op":"mtgox.subscribe", "key":data}))
+        self.send(self._SUBSCRIBE_KEY % json.dumps(data))
 
     def slot_timer(self, _sender, _data):
         """check timeout (last received, dead socket?)"""
@@ -1119,6 +1322,13 @@ class WebsocketClient(BaseClient):
     def __init__(self, curr_base, curr_quote, secret, config):
         BaseClient.__init__(self, curr_base, curr_quote, secret, config)
         self.hostname = WEBSOCKET_HOST
+        self._ping_timer = Timer(WEBSOCKET_PING_INTERVAL)
+        self._ping_timer.connect(self.slot_keepalive_timer)
+
+    def stop(self):
+        """stop the client"""
+        BaseClient.stop(self)
+        self._ping_timer.cancel()
 
     def _recv_thread_func(self):
         """connect to the websocket and start receiving in an infinite loop.
@@ -1146,6 +1356,10 @@ class WebsocketClient(BaseClient):
                 self.debug("### trying plain old Websocket: %s ... " % ws_url)
 
                 self.socket = websocket.WebSocket()
+                self.socket.sock.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+                self.socket.sock.setsockopt(
+                    socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 # The server is somewhat picky when it comes to the exact
                 # host:port syntax of the origin header, so I am supplying
                 # my own origin header instead of the auto-generated one
@@ -1157,10 +1371,25 @@ class WebsocketClient(BaseClient):
                 self.debug("### waiting for data...")
                 self.signal_connected(self, None)
                 while not self._terminating: #loop1 (read messages)
-                    str_json = self.socket.recv()
+                    # read frames instead of recv() because recv() would
+                    # swallow the pongs and they must count as activity
+                    # too, otherwise the pings could not prevent the
+                    # reconnect in slot_timer() on a quiet connection.
+                    frame = self.socket.recv_frame()
+                    if not frame:
+                        raise websocket.WebSocketException("invalid frame")
                     self._time_last_received = time.time()
-                    if str_json[0] == "{":
-                        self.signal_recv(self, (str_json))
+                    opcode = frame.opcode
+                    if opcode == websocket.ABNF.OPCODE_TEXT:
+                        str_json = frame.data
+                        if str_json[:1] == "{":
+                            self.recv_queue.put(str_json)
+                    elif opcode == websocket.ABNF.OPCODE_PING:
+                        self.socket.pong(frame.data)
+                    elif opcode == websocket.ABNF.OPCODE_CLOSE:
+                        self.socket.send_close()
+                        raise websocket.WebSocketConnectionClosedException(
+                            "closed by server")
 
             except Exception as exc:
                 self.connected = False
@@ -1176,6 +1405,11 @@ class WebsocketClient(BaseClient):
         """send the json encoded string over the websocket"""
         self._try_send_raw(json_str)
 
+    def slot_keepalive_timer(self, _sender, _data):
+        """send a ping, just to make sure our socket is not dead"""
+        if self.connected:
+            self._try_send_raw("", websocket.ABNF.OPCODE_PING)
+
 
 class SocketIO(websocket.WebSocket):
     """This is the WebSocket() class with added Super Cow Powers. It has a
@@ -1264,9 +1498,8 @@ class PubnubClient(BaseClient):
 
     def stop(self):
         """stop the client"""
-        self._terminating = True
+        BaseClient.stop(self) # also ends the dispatch and download threads
         self.stream_sorter.stop()
-        self._timer.cancel()
         self.force_reconnect()
 
     def force_reconnect(self):
@@ -1451,6 +1684,10 @@ class PubnubStreamSorter(BaseObject):
 class SocketIOClient(BaseClient):
     """this implements a connection to MtGox using the socketIO protocol."""
 
+    # all json messages we are interested in start with this
+    _JSON_PREFIX = "4::/mtgox:{"
+    _JSON_START = len("4::/mtgox:")
+
     def __init__(self, curr_base, curr_quote, secret, config):
         BaseClient.__init__(self, curr_base, curr_quote, secret, config)
         self.hostname = SOCKETIO_HOST
@@ -1476,6 +1713,10 @@ class SocketIOClient(BaseClient):
                     querystring = "Channel=ticker.%s" % (sym)
                 self.debug("### trying Socket.IO: %s?%s ..." % (url, querystring))
                 self.socket = SocketIO()
+                self.socket.sock.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+                self.socket.sock.setsockopt(
+                    socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 self.socket.connect(url, query=querystring)
 
                 self._time_last_received = time.time()
@@ -1498,11 +1739,8 @@ class SocketIOClient(BaseClient):
                         #self.debug("### ping -> pong")
                         self.socket.send("2::")
                         continue
-                    prefix = msg[:10]
-                    if prefix == "4::/mtgox:":
-                        str_json = msg[10:]
-                        if str_json[0] == "{":
-                            self.signal_recv(self, (str_json))
+                    if msg.startswith(self._JSON_PREFIX):
+                        self.recv_queue.put(msg[self._JSON_START:])
 
             except Exception as exc:
                 self.connected = False
@@ -1534,6 +1772,9 @@ class Gox(BaseObject):
     events, it will emit signals you can hook into for all events,
     it has methods to buy and sell"""
 
+    # finds the stamp in messages that slot_recv() drops without parsing
+    _STAMP_RE = re.compile(r'"stamp"\s*:\s*"?(\d+)')
+
     def __init__(self, secret, config):
         """initialize the gox API but do not yet connect to it."""
         BaseObject.__init__(self)
@@ -1568,6 +1809,11 @@ class Gox(BaseObject):
         self.count_submitted = 0  # number of submitted orders not yet acked
         self.msg = {} # the incoming message that is currently processed
 
+        # message handler methods, looked up by name once and then cached,
+        # see _find_handler(). {"op name": method or None}
+        self._op_handlers = {}
+        self._private_handlers = {}
+
         # the following will be set to true once the information
         # has been received after connect, once all thes flags are
         # true it will emit the signal_connected.
@@ -1581,6 +1827,15 @@ class Gox(BaseObject):
 
         self.currency = self.curr_quote # deprecated, use curr_quote instead
 
+        # trades in all currencies arrive on the same channel, slot_recv()
+        # uses these to drop the foreign ones before parsing them
+        self._trade_channel = CHANNELS.get("trade.%s" % self.curr_base)
+        self._quote_token = '"%s"' % self.curr_quote
+
+        # formatting a debug line for every tick, depth and trade message
+        # costs more than handling the message itself, it can be turned off
+        self.debug_market_data = config.get_bool("gox", "debug_market_data")
+
         # these are needed for conversion from/to intereger, float, string
         if self.curr_quote in "JPY SEK":
             self.mult_quote = 1e3
@@ -1591,6 +1846,12 @@ class Gox(BaseObject):
         self.mult_base = 1e8
         self.format_base = "%16.8f"
 
+        # cache for base2str() and quote2str(), prices and volumes are
+        # discrete integers and the same ones are formatted over and over
+        # again by the UI on every repaint.
+        self._str_cache_base = {}
+        self._str_cache_quote = {}
+
         Signal.signal_error.connect(self.signal_debug)
 
         timeframe = 60 * config.get_int("gox", "history_timeframe")
@@ -1688,7 +1949,15 @@ class Gox(BaseObject):
 
     def base2str(self, int_number):
         """convert base currency values from mtgox integer to formatted string"""
-        return self.format_base % (float(int_number) / self.mult_base)
+        cache = self._str_cache_base
+        try:
+            return cache[int_number]
+        except KeyError:
+            if len(cache) > STR_CACHE_SIZE:
+                cache.clear()
+            txt = self.format_base % (float(int_number) / self.mult_base)
+            cache[int_number] = txt
+            return txt
 
     def base2int(self, float_number):
         """convert base currency values from float to mtgox integer"""
@@ -1702,7 +1971,15 @@ class Gox(BaseObject):
 
     def quote2str(self, int_number):
         """convert quote currency values from mtgox integer to formatted string"""
-        return self.format_quote % (float(int_number) / self.mult_quote)
+        cache = self._str_cache_quote
+        try:
+            return cache[int_number]
+        except KeyError:
+            if len(cache) > STR_CACHE_SIZE:
+                cache.clear()
+            txt = self.format_quote % (float(int_number) / self.mult_quote)
+            cache[int_number] = txt
+            return txt
 
     def quote2int(self, float_number):
         """convert quote currency values from float to mtgox integer"""
@@ -1752,6 +2029,12 @@ class Gox(BaseObject):
         self._was_disconnected = True
         self.signal_disconnected(self, None)
 
+    def _update_socket_lag(self, stamp):
+        """update the moving average of the socket lag with the stamp
+        (server time in microseconds) of a received message"""
+        delay = time.time() * 1e6 - int(stamp)
+        self.socket_lag = (self.socket_lag * 29 + delay) / 30
+
     def slot_recv(self, dummy_sender, data):
         """Slot for signal_recv, handle new incoming JSON message. Decode the
         JSON string into a Python object and dispatch it to the method that
@@ -1761,19 +2044,26 @@ class Gox(BaseObject):
         if type(str_json) == dict:
             msg = str_json # was already a dict
         else:
-            msg = json.loads(str_json)
+            # A trade that does not even contain our quote currency
+            # anywhere would be ignored by _on_op_private_trade() anyway,
+            # a substring search is much cheaper than parsing the json.
+            # Its stamp still counts for the socket lag.
+            if self._trade_channel and self._trade_channel in str_json \
+                    and self._quote_token not in str_json:
+                match = self._STAMP_RE.search(str_json)
+                if match:
+                    self._update_socket_lag(match.group(1))
+                return
+            msg = json_loads(str_json)
         self.msg = msg
 
         if "stamp" in msg:
-            delay = time.time() * 1e6 - int(msg["stamp"])
-            self.socket_lag = (self.socket_lag * 29 + delay) / 30
+            self._update_socket_lag(msg["stamp"])
 
         if "op" in msg:
-            try:
-                msg_op = msg["op"]
-                handler = getattr(self, "_on_op_" + msg_op)
-
-            except AttributeError:
+            msg_op = msg["op"]
+            handler = self._find_handler(self._op_handlers, "_on_op_", msg_op)
+            if not handler:
                 self.debug("slot_recv() ignoring: op=%s" % msg_op)
         else:
             self.debug("slot_recv() ignoring:", msg)
@@ -1781,6 +2071,17 @@ class Gox(BaseObject):
         if handler:
             handler(msg)
 
+    def _find_handler(self, cache, prefix, name):
+        """return the handler method prefix + name or None if there is no
+        such method. The result is remembered in the dict cache so that the
+        method name is built and looked up only once for every message type"""
+        try:
+            return cache[name]
+        except KeyError:
+            handler = getattr(self, prefix + name, None)
+            cache[name] = handler
+            return handler
+
     def slot_poll(self, _sender, _data):
         """poll stuff from http in regular intervals, not yet implemented"""
         if self.client.secret and self.client.secret.know_secret():
@@ -1873,10 +2174,9 @@ class Gox(BaseObject):
         we subscribed (trade, depth, ticker) and also the per-account messages
         (user_order, wallet, own trades, etc)"""
         private = msg["private"]
-        handler = None
-        try:
-            handler = getattr(self, "_on_op_private_" + private)
-        except AttributeError:
+        handler = self._find_handler(
+            self._private_handlers, "_on_op_private_", private)
+        if not handler:
             self.debug("### _on_op_private() ignoring: private=%s" % private)
             self.debug(pretty_format(msg))
 
@@ -1886,17 +2186,19 @@ class Gox(BaseObject):
     def _on_op_private_ticker(self, msg):
         """handle incoming ticker message (op=private, private=ticker)"""
         msg = msg["ticker"]
-        if msg["sell"]["currency"] != self.curr_quote:
+        sell = msg["sell"]
+        if sell["currency"] != self.curr_quote:
             return
         if msg["item"] != self.curr_base:
             return
         bid = int(msg["buy"]["value_int"])
-        ask = int(msg["sell"]["value_int"])
+        ask = int(sell["value_int"])
 
-        self.debug(" tick: %s %s" % (
-            self.quote2str(bid),
-            self.quote2str(ask)
-        ))
+        if self.debug_market_data:
+            self.debug(" tick: %s %s" % (
+                self.quote2str(bid),
+                self.quote2str(ask)
+            ))
         self.signal_ticker(self, (bid, ask))
 
     def _on_op_private_depth(self, msg):
@@ -1909,34 +2211,34 @@ class Gox(BaseObject):
         typ = msg["type_str"]
         price = int(msg["price_int"])
         volume = int(msg["volume_int"])
-        timestamp = int(msg["now"])
         total_volume = int(msg["total_volume_int"])
 
-        delay = time.time() * 1e6 - timestamp
-
-        self.debug("depth: %s: %s @ %s total vol: %s (age: %0.2f s)" % (
-            typ,
-            self.base2str(volume),
-            self.quote2str(price),
-            self.base2str(total_volume),
-            delay / 1e6
-        ))
+        if self.debug_market_data:
+            delay = time.time() * 1e6 - int(msg["now"])
+            self.debug("depth: %s: %s @ %s total vol: %s (age: %0.2f s)" % (
+                typ,
+                self.base2str(volume),
+                self.quote2str(price),
+                self.base2str(total_volume),
+                delay / 1e6
+            ))
         self.signal_depth(self, (typ, price, volume, total_volume))
 
     def _on_op_private_trade(self, msg):
         """handle incoming trade mesage (op=private, private=trade)"""
-        if msg["trade"]["price_currency"] != self.curr_quote:
+        trade = msg["trade"]
+        if trade["price_currency"] != self.curr_quote:
             return
-        if msg["trade"]["item"] != self.curr_base:
+        if trade["item"] != self.curr_base:
             return
         if msg["channel"] == CHANNELS["trade.%s" % self.curr_base]:
             own = False
         else:
             own = True
-        date = int(msg["trade"]["date"])
-        price = int(msg["trade"]["price_int"])
-        volume = int(msg["trade"]["amount_int"])
-        typ = msg["trade"]["trade_type"]
+        date = int(trade["date"])
+        price = int(trade["price_int"])
+        volume = int(trade["amount_int"])
+        typ = trade["trade_type"]
 
         if own:
             self.debug("trade: %s: %s @ %s (own order filled)" % (
@@ -1948,7 +2250,7 @@ class Gox(BaseObject):
             # changed. We request it a minute later because the server
             # seems to need some time until the new values are available.
             self.client.request_info_later(60)
-        else:
+        elif self.debug_market_data:
             self.debug("trade: %s: %s @ %s" % (
                 typ,
                 self.base2str(volume),
@@ -2097,8 +2399,13 @@ class Gox(BaseObject):
         self.signal_order_too_fast(self, msg)
 
 
-class Level:
+class Level(object):
     """represents a level in the orderbook"""
+
+    # a full depth has thousands of these, don't give each one a __dict__
+    __slots__ = ("price", "volume", "own_volume",
+                 "_cache_total_vol", "_cache_total_vol_quote")
+
     def __init__(self, price, volume):
         self.price = price
         self.volume = volume
@@ -2110,8 +2417,11 @@ class Level:
         self._cache_total_vol = 0
         self._cache_total_vol_quote = 0
 
-class Order:
+class Order(object):
     """represents an order"""
+
+    __slots__ = ("price", "volume", "typ", "oid", "status")
+
     def __init__(self, price, volume, typ, oid="", status=""):
         """initialize a new order object"""
         self.price = price
@@ -2135,9 +2445,10 @@ class OrderBook(BaseObject):
         """orderbook state has changed
         param: None
         an update to the state of the orderbook happened, this is emitted very
-        often, it happens after every depth message, after every trade and
-        also after every user_order message. This signal is for example used
-        in goxtool.py to repaint the user interface of the orderbook window."""
+        often, it happens after every depth message, after every trade that
+        changed the book and also after every user_order message. This signal
+        is for example used in goxtool.py to repaint the user interface of the
+        orderbook window."""
 
         self.signal_fulldepth_processed = Signal()
         """fulldepth download is complete
@@ -2205,6 +2516,11 @@ class OrderBook(BaseObject):
         self.bids = [] # list of Level(), lowest ask first
         self.asks = [] # list of Level(), highest bid first
         self.owns = [] # list of Order(), unordered list
+        self._owns_by_oid = {} # the same orders in a dict {oid: Order()}
+
+        # total volume of own orders {(typ, price): volume}, this is kept
+        # in sync with the owns list, see get_own_volume_at()
+        self._own_volume_index = {}
 
         self.bid = 0
         self.ask = 0
@@ -2252,6 +2568,7 @@ class OrderBook(BaseObject):
         bids and asks and then another time with own=True to update our
         own orders list"""
         (dummy_date, price, volume, typ, own) = data
+        changed = False
         if own:
             # nothing special to do here (yet), there will also be
             # separate user_order messages to update my owns list
@@ -2262,9 +2579,10 @@ class OrderBook(BaseObject):
             # message but we update the orderbook immediately.
             voldiff = -volume
             if typ == "bid":  # tryde_type=bid means an ask order was filled
-                self._repair_crossed_asks(price)
+                changed = self._repair_crossed_asks(price)
                 if len(self.asks):
                     if self.asks[0].price == price:
+                        changed = True
                         self.asks[0].volume -= volume
                         if self.asks[0].volume <= 0:
                             voldiff -= self.asks[0].volume
@@ -2278,9 +2596,10 @@ class OrderBook(BaseObject):
                     self.ask = self.asks[0].price
 
             if typ == "ask":  # trade_type=ask means a bid order was filled
-                self._repair_crossed_bids(price)
+                changed = self._repair_crossed_bids(price)
                 if len(self.bids):
                     if self.bids[0].price == price:
+                        changed = True
                         self.bids[0].volume -= volume
                         if self.bids[0].volume <= 0:
                             voldiff -= self.bids[0].volume
@@ -2293,12 +2612,14 @@ class OrderBook(BaseObject):
                 if len(self.bids):
                     self.bid = self.bids[0].price
 
-        self.signal_changed(self, None)
+        # own trades and trades that did not touch the top of the
+        # book don't change anything, no need to repaint everything
+        if changed:
+            self.signal_changed(self, None)
 
     def slot_user_order(self, dummy_sender, data):
         """Slot for signal_userorder, process incoming user_order mesage"""
         (price, volume, typ, oid, status) = data
-        found   = False
         removed = False # was the order removed?
         opened  = False # did the order change from 'post-pending' to 'open'"?
         voldiff = 0     # did the order volume change (full or partial fill)
@@ -2308,55 +2629,52 @@ class OrderBook(BaseObject):
         if "post-pending" in status:
             # don't need this status at all
             return
+        order = self._owns_by_oid.get(oid)
         if "removed" in status:
-            for i in range(len(self.owns)):
-                if self.owns[i].oid == oid:
-                    order = self.owns[i]
-
-                    # work around MtGox strangeness:
-                    # for some reason it will send a "completed_passive"
-                    # immediately followed by a "completed_active" when a
-                    # market order is filled and removed. Since "completed_passive"
-                    # is meant for limit orders only we will just completely
-                    # IGNORE all "completed_passive" if it affects a market order,
-                    # there WILL follow a "completed_active" immediately after.
-                    if order.price == 0:
-                        if "passive" in status:
-                            # ignore it, the correct one with
-                            # "active" will follow soon
-                            return
-
-                    self.debug(
-                        "### removing order %s " % oid,
-                        "price:", self.gox.quote2str(order.price),
-                        "type:", order.typ)
-
-                    # remove it from owns...
-                    self.owns.pop(i)
-
-                    # ...and update own volume cache in the bids or asks
-                    self._update_level_own_volume(
-                        order.typ,
-                        order.price,
-                        self.get_own_volume_at(order.price, order.typ)
-                    )
-                    removed = True
-                    break
+            if order:
+                # work around MtGox strangeness:
+                # for some reason it will send a "completed_passive"
+                # immediately followed by a "completed_active" when a
+                # market order is filled and removed. Since "completed_passive"
+                # is meant for limit orders only we will just completely
+                # IGNORE all "completed_passive" if it affects a market order,
+                # there WILL follow a "completed_active" immediately after.
+                if order.price == 0:
+                    if "passive" in status:
+                        # ignore it, the correct one with
+                        # "active" will follow soon
+                        return
+
+                self.debug(
+                    "### removing order %s " % oid,
+                    "price:", self.gox.quote2str(order.price),
+                    "type:", order.typ)
+
+                # remove it from owns...
+                self.owns.remove(order)
+                del self._owns_by_oid[oid]
+                self._index_own_volume(order, -order.volume)
+
+                # ...and update own volume cache in the bids or asks
+                self._update_level_own_volume(
+                    order.typ,
+                    order.price,
+                    self.get_own_volume_at(order.price, order.typ)
+                )
+                removed = True
         else:
-            for order in self.owns:
-                if order.oid == oid:
-                    found = True
-                    self.debug(
-                        "### updating order %s " % oid,
-                        "volume:", self.gox.base2str(volume),
-                        "status:", status)
-                    voldiff = volume - order.volume
-                    opened = (order.status != "open" and status == "open")
-                    order.volume = volume
-                    order.status = status
-                    break
-
-            if not found:
+            if order:
+                self.debug(
+                    "### updating order %s " % oid,
+                    "volume:", self.gox.base2str(volume),
+                    "status:", status)
+                voldiff = volume - order.volume
+                opened = (order.status != "open" and status == "open")
+                self._index_own_volume(order, voldiff)
+                order.volume = volume
+                order.status = status
+
+            else:
                 # This can happen if we added the order with a different
                 # application or the gox server sent the user_order message
                 # before the reply to "order/add" (this can happen because
@@ -2406,7 +2724,11 @@ class OrderBook(BaseObject):
             price = int(order["price_int"])
             volume = int(order["amount_int"])
             self._update_total_bid(volume, price)
-            self.bids.insert(0, Level(price, volume))
+            self.bids.append(Level(price, volume))
+
+        # bids come in ascending order but we keep them descending,
+        # reversing once is O(n), inserting every level at 0 was O(n^2)
+        self.bids.reverse()
 
         # update own volume cache
         for order in self.owns:
@@ -2427,25 +2749,33 @@ class OrderBook(BaseObject):
     def _repair_crossed_bids(self, bid):
         """remove all bids that are higher that official current bid value,
         this should actually never be necessary if their feed would not
-        eat depth- and trade-messages occaionally :-("""
-        while len(self.bids) and self.bids[0].price > bid:
-            price = self.bids[0].price
-            volume = self.bids[0].volume
-            self._update_total_bid(-volume, price)
-            self.bids.pop(0)
+        eat depth- and trade-messages occaionally :-(
+        Returns True if anything was removed."""
+        lst = self.bids
+        count = 0
+        while count < len(lst) and lst[count].price > bid:
+            self._update_total_bid(-lst[count].volume, lst[count].price)
+            count += 1
+        if count:
+            # remove them all at once, pop(0) would move the list every time
+            del lst[:count]
             self._valid_bid_cache = -1
-            #self.debug("### repaired bid")
+        return count > 0
 
     def _repair_crossed_asks(self, ask):
         """remove all asks that are lower that official current ask value,
         this should actually never be necessary if their feed would not
-        eat depth- and trade-messages occaionally :-("""
-        while len(self.asks) and self.asks[0].price < ask:
-            volume = self.asks[0].volume
-            self._update_total_ask(-volume)
-            self.asks.pop(0)
+        eat depth- and trade-messages occaionally :-(
+        Returns True if anything was removed."""
+        lst = self.asks
+        count = 0
+        while count < len(lst) and lst[count].price < ask:
+            self._update_total_ask(-lst[count].volume)
+            count += 1
+        if count:
+            del lst[:count]
             self._valid_ask_cache = -1
-            #self.debug("### repaired ask")
+        return count > 0
 
     def _update_book(self, typ, price, total_vol):
         """update the bids or asks list, insert or remove level and
@@ -2521,21 +2851,35 @@ class OrderBook(BaseObject):
         index is the index if its an exact match or the index of the next
         element if it was not found (can be used for inserting) and level
         is either a reference to the found level or None if not found."""
-        lst = {"ask": self.asks, "bid": self.bids}[typ]
-        comp = {"ask": lambda x, y: x < y, "bid": lambda x, y: x > y}[typ]
         low = 0
-        high = len(lst)
-
-        # binary search
-        while low < high:
-            mid = (low + high) // 2
-            midval = lst[mid].price
-            if comp(midval, price):
-                low = mid + 1
-            elif comp(price, midval):
-                high = mid
-            else:
-                return (lst, mid, lst[mid])
+
+        # binary search, asks are sorted ascending and bids descending.
+        # This is called for every depth message, so the comparisons
+        # are written out for both sides instead of using a comparator.
+        if typ == "ask":
+            lst = self.asks
+            high = len(lst)
+            while low < high:
+                mid = (low + high) // 2
+                midval = lst[mid].price
+                if midval < price:
+                    low = mid + 1
+                elif midval > price:
+                    high = mid
+                else:
+                    return (lst, mid, lst[mid])
+        else:
+            lst = self.bids
+            high = len(lst)
+            while low < high:
+                mid = (low + high) // 2
+                midval = lst[mid].price
+                if midval > price:
+                    low = mid + 1
+                elif midval < price:
+                    high = mid
+                else:
+                    return (lst, mid, lst[mid])
 
         # not found, return insertion point (index of next higher level)
         return (lst, high, None)
@@ -2562,20 +2906,26 @@ class OrderBook(BaseObject):
     def get_own_volume_at(self, price, typ=None):
         """returns the sum of the volume of own orders at a given price. This
         method will not look up the cache in the bids or asks lists, it will
-        use the authoritative data from the owns list bacause this method is
-        also used to calculate these cached values in the first place."""
-        volume = 0
-        for order in self.owns:
-            if order.price == price and (not typ or typ == order.typ):
-                volume += order.volume
-        return volume
+        use the index that is maintained together with the owns list because
+        this method is also used to calculate these cached values."""
+        index = self._own_volume_index
+        if typ:
+            return index.get((typ, price), 0)
+        return index.get(("bid", price), 0) + index.get(("ask", price), 0)
+
+    def _index_own_volume(self, order, voldiff):
+        """add voldiff to the own volume index at the order's type and price,
+        this must be called whenever the owns list or an order volume changes"""
+        key = (order.typ, order.price)
+        volume = self._own_volume_index.get(key, 0) + voldiff
+        if volume:
+            self._own_volume_index[key] = volume
+        else:
+            self._own_volume_index.pop(key, None)
 
     def have_own_oid(self, oid):
         """do we have an own order with this oid in our list already?"""
-        for order in self.owns:
-            if order.oid == oid:
-                return True
-        return False
+        return oid in self._owns_by_oid
 
     # pylint: disable=W0212
     def get_total_up_to(self, price, is_ask):
@@ -2583,32 +2933,19 @@ class OrderBook(BaseObject):
         and this price. This will calculate the total on demand, it has a cache
         to not repeat the same calculations more often than absolutely needed"""
         if is_ask:
-            lst = self.asks
             known_level = self._valid_ask_cache
-            comp = lambda x, y: x < y
+            (lst, index, level) = self._find_level("ask", price)
         else:
-            lst = self.bids
             known_level = self._valid_bid_cache
-            comp = lambda x, y: x > y
+            (lst, index, level) = self._find_level("bid", price)
 
         # now first we need the list index of the level we are looking for or
         # if it doesn't match exactly the index of the level right before that
-        # price, for this we do a quick binary search for the price
-        low = 0
-        high = len(lst)
-        while low < high:
-            mid = (low + high) // 2
-            midval = lst[mid].price
-            if comp(midval, price):
-                low = mid + 1
-            elif comp(price, midval):
-                high = mid
-            else:
-                break
-        if comp(price, midval):
-            needed_level = mid - 1
+        # price, _find_level() gives us the index of the next level then.
+        if level:
+            needed_level = index
         else:
-            needed_level = mid
+            needed_level = index - 1
 
         # if the total volume at this level has been calculated
         # already earlier then we don't need to do anything further,
@@ -2646,6 +2983,8 @@ class OrderBook(BaseObject):
         """called by gox when the initial order list is downloaded,
         this will happen after connect or reconnect"""
         self.owns = []
+        self._owns_by_oid = {}
+        self._own_volume_index = {}
 
         # also reset the own volume cache in bids and ass list
         for level in self.bids + self.asks:
@@ -2686,6 +3025,8 @@ class OrderBook(BaseObject):
         initial download of complete order list."""
         if not self.have_own_oid(order.oid):
             self.owns.append(order)
+            self._owns_by_oid[order.oid] = order
+            self._index_own_volume(order, order.volume)
 
             # update own volume in that level:
             self._update_level_own_volume(
@@ -28,10 +28,12 @@ import curses
 import curses.panel
 import curses.textpad
 import goxapi
+import itertools
 import logging
 import locale
 import math
 import os
+import Queue
 import sys
 import time
 import traceback
@@ -48,6 +50,13 @@ HEIGHT_STATUS   = 2
 HEIGHT_CON      = 7
 WIDTH_ORDERBOOK = 45
 
+FRAME_INTERVAL  = 1.0 / 30  # paint dirty windows at most 30 times per second
+
+# DEC private mode 2026, the terminal holds back screen updates between
+# these two and then shows the complete frame at once (no tearing)
+SYNC_OUTPUT_BEGIN = "\x1b[?2026h"
+SYNC_OUTPUT_END   = "\x1b[?2026l"
+
 COLORS =    [["con_text",       curses.COLOR_BLUE,    curses.COLOR_CYAN]
             ,["con_text_buy",   curses.COLOR_BLUE,    curses.COLOR_GREEN]
             ,["con_text_sell",  curses.COLOR_BLUE,    curses.COLOR_RED]
@@ -85,6 +94,7 @@ INI_DEFAULTS =  [["goxtool", "set_xterm_title", "True"]
                 ,["goxtool", "show_depth", "True"]
                 ,["goxtool", "show_trade", "True"]
                 ,["goxtool", "show_trade_own", "True"]
+                ,["goxtool", "sync_output", "auto"]
                 ]
 
 COLOR_PAIR = {}
@@ -141,10 +151,64 @@ def try_get_lock_or_break_open():
     print "### could not acquire signal lock, frozen slot somewhere?"
     print "### please see the stacktrace log to determine the cause."
 
+def terminal_has_sync_output():
+    """True if the terminfo entry announces synchronized output. Not every
+    terminal that supports it has the (extended) Sync capability in its
+    terminfo, so sync_output can also be set to True in the .ini."""
+    try:
+        return bool(curses.tigetstr("Sync"))
+    except curses.error:
+        return False
+
+def paint_dirty_windows():
+    """paint all windows that have been marked dirty since the last frame.
+    This must be called from the main thread whenever getch() returns,
+    it will do nothing if the last frame was painted less than
+    FRAME_INTERVAL ago, so no matter how many signals arrive each
+    window will be painted at most once per frame. Returns True if
+    anything has been painted."""
+    if time.time() - Win.time_last_frame < FRAME_INTERVAL:
+        return False
+    # pylint: disable=W0212
+    with goxapi.Signal._lock:
+        dirty = list(Win.dirty_windows)
+        Win.dirty_windows.clear()
+        if dirty:
+            curses.curs_set(0)
+            for win in dirty:
+                if win.win:
+                    try:
+                        win.paint()
+                    except KeyboardInterrupt:
+                        raise
+                    except: # pylint: disable=W0702
+                        # report it like Signal did when paint() still
+                        # ran in a slot, one broken window must not
+                        # take the whole application down
+                        goxapi.Signal.signal_error(win, traceback.format_exc())
+            # one single update_panels() and doupdate() for all of them
+            curses.panel.update_panels()
+            if Win.sync_output:
+                # the flushes keep our escapes in order with the output
+                # of curses which has its own buffer on the same fd
+                sys_out.write(SYNC_OUTPUT_BEGIN)
+                sys_out.flush()
+                curses.doupdate()
+                sys_out.write(SYNC_OUTPUT_END)
+                sys_out.flush()
+            else:
+                curses.doupdate()
+        Win.time_last_frame = time.time()
+        return len(dirty) > 0
+
 class Win:
     """represents a curses window"""
     # pylint: disable=R0902
 
+    dirty_windows = set()   # windows that need paint(), see mark_dirty()
+    time_last_frame = 0     # time of last paint_dirty_windows()
+    sync_output = False     # wrap doupdate() in SYNC_OUTPUT_BEGIN/END
+
     def __init__(self, stdscr):
         """create and initialize the window. This will also subsequently
         call the paint() method."""
@@ -177,6 +241,12 @@ class Win:
             self.paint()
             self.done_paint()
 
+    def mark_dirty(self):
+        """call this if you want the window to repaint itself with the next
+        frame. Use this instead of do_paint() in slots that are connected
+        to frequently emitted signals, see paint_dirty_windows()"""
+        Win.dirty_windows.add(self)
+
     # method could be a function - pylint: disable=R0201
     def done_paint(self):
         """update the sreen after paint operations, this will invoke all
@@ -266,20 +336,43 @@ class WinConsole(Win):
         """create the console window and connect it to the Gox debug
         callback function"""
         self.gox = gox
+        self.pending = [] # lines not yet written, list of (txt, col)
+        self.need_bkgd = True # window is new, background not yet set
         gox.signal_debug.connect(self.slot_debug)
         Win.__init__(self, stdscr)
 
     def paint(self):
-        """just empty the window after resize (I am lazy)"""
-        self.win.bkgd(" ", COLOR_PAIR["con_text"])
+        """write all pending lines. Old contents are not repainted, they
+        are only written once and copied over on resize"""
+        if self.need_bkgd:
+            self.win.bkgd(" ", COLOR_PAIR["con_text"])
+            self.need_bkgd = False
+
+        # lines that would scroll out immediately need not be written
+        pending = self.pending[-self.height:]
+        self.pending = []
+        for txt, col in pending:
+            self.win.addstr("\n" + txt,  col)
 
     def resize(self):
-        """resize and print a log message. Old messages will have been
-        lost after resize because of my dumb paint() implementation, so
-        at least print a message indicating that fact into the
-        otherwise now empty console window"""
+        """resize and copy the old contents over into the new window
+        so the messages that were visible before won't get lost"""
+        old_win = self.win
+        old_width = self.width
+
+        # pending lines must go below the copied contents, not under them
+        pending = self.pending
+        self.pending = []
+        self.need_bkgd = True
         Win.resize(self)
-        self.write("### console has been resized")
+        if old_win and self.win:
+            rows = min(self.height, old_win.getmaxyx()[0])
+            cols = min(self.width, old_width)
+            old_win.overwrite(self.win, 0, 0, 0, 0, rows - 1, cols - 1)
+            posy, posx = old_win.getyx()
+            self.win.move(min(posy, rows - 1), min(posx, cols - 1))
+        self.pending = pending + self.pending
+        self.mark_dirty()
 
     def calc_size(self):
         """put it at the bottom of the screen"""
@@ -291,7 +384,9 @@ class WinConsole(Win):
         self.write(txt)
 
     def write(self, txt):
-        """write a line of text, scroll if needed"""
+        """write a line of text, scroll if needed. This may be called from
+        any thread, the line is only queued here and the actual writing
+        happens in paint() on the main thread with the next frame."""
         if not self.win:
             return
 
@@ -316,8 +411,8 @@ class WinConsole(Win):
             col = COLOR_PAIR["con_text_buy"] + curses.A_BOLD
         if "trade: ask:" in txt:
             col = COLOR_PAIR["con_text_sell"] + curses.A_BOLD
-        self.win.addstr("\n" + txt,  col)
-        self.done_paint()
+        self.pending.append((txt, col))
+        self.mark_dirty()
 
 
 class WinOrderBook(Win):
@@ -327,9 +422,16 @@ class WinOrderBook(Win):
         """create the orderbook window and connect it to the
         onChanged callback of the gox.orderbook instance"""
         self.gox = gox
+        self.row_cache = None # row contents as painted last time, None = erased
+        self.last_title = None # last string written to the xterm title bar
         gox.orderbook.signal_changed.connect(self.slot_changed)
         Win.__init__(self, stdscr)
 
+    def resize(self):
+        """the new window will be empty, forget what we painted before"""
+        self.row_cache = None
+        Win.resize(self)
+
     def calc_size(self):
         """put it into the middle left side"""
         self.height = self.termheight - HEIGHT_CON - HEIGHT_STATUS
@@ -337,7 +439,9 @@ class WinOrderBook(Win):
         self.width = WIDTH_ORDERBOOK
 
     def paint(self):
-        """paint the visible portion of the orderbook"""
+        """paint the visible portion of the orderbook. Only the rows that
+        have changed since the last paint will actually be painted, usually
+        only one or two levels change between two consecutive calls."""
 
         def paint_row(pos, price, vol, ownvol, color, changevol):
             """paint a row in the orderbook (bid or ask)"""
@@ -347,13 +451,18 @@ class WinOrderBook(Win):
                 col2 = col_ask + curses.A_BOLD
             else:
                 col2 = col_vol
+            self.win.move(pos, 0)
+            self.win.clrtoeol()
             self.addstr(pos, 0,  book.gox.quote2str(price), color)
             self.addstr(pos, 12, book.gox.base2str(vol), col2)
             if ownvol:
                 self.addstr(pos, 28, book.gox.base2str(ownvol), col_own)
 
-        self.win.bkgd(" ",  COLOR_PAIR["book_text"])
-        self.win.erase()
+        if self.row_cache is None:
+            self.win.bkgd(" ",  COLOR_PAIR["book_text"])
+            self.win.erase()
+            self.row_cache = {}
+        rows = {}
 
         gox = self.gox
         book = gox.orderbook
@@ -370,12 +479,20 @@ class WinOrderBook(Win):
         if group == 0:
             group = 1
 
+        # sum up own volumes per price once, the bins below only need
+        # to look them up instead of scanning all own orders for each bin
+        own_vols = {"ask": {}, "bid": {}}
+        if group != 1:
+            for order in book.owns:
+                if order.price > 0 and order.typ in own_vols:
+                    vols = own_vols[order.typ]
+                    vols[order.price] = vols.get(order.price, 0) + order.volume
+
         #
         #
         # paint the asks (first we put them into bins[] then we paint them)
         #
         if len(book.asks):
-            i = 0
             bins = []
             pos = mid - 1
             vol = 0
@@ -383,18 +500,13 @@ class WinOrderBook(Win):
 
             # no grouping, bins can be created in one simple and fast loop
             if group == 1:
-                cnt = len(book.asks)
-                while pos >= 0 and i < cnt:
-                    level = book.asks[i]
-                    price = level.price
+                for level in itertools.islice(book.asks, 0, pos + 1):
                     if sum_total:
                         vol += level.volume
                     else:
                         vol = level.volume
-                    ownvol = level.own_volume
-                    bins.append([pos, price, vol, ownvol, 0])
+                    bins.append([pos, level.price, vol, level.own_volume, 0])
                     pos -= 1
-                    i += 1
 
             # with gouping its a bit more complicated
             else:
@@ -423,16 +535,13 @@ class WinOrderBook(Win):
                     bin_price += group
 
                 # now add the own volumes to their bins
-                for order in book.owns:
-                    if order.typ == "ask" and order.price > 0:
-                        order_bin_price = int(math.ceil(float(order.price) / group) * group)
-                        for abin in bins:
-                            if abin[1] == order.price:
-                                abin[3] += order.volume
-                                break
-                            if abin[1] == order_bin_price:
-                                abin[3] += order.volume
-                                break
+                bin_index = dict((abin[1], abin) for abin in bins)
+                for price, volume in own_vols["ask"].items():
+                    abin = bin_index.get(price)
+                    if not abin:
+                        abin = bin_index.get(int(math.ceil(float(price) / group) * group))
+                    if abin:
+                        abin[3] += volume
 
             # mark the level where change took place (optional)
             if gox.config.get_bool("goxtool", "highlight_changes"):
@@ -446,16 +555,14 @@ class WinOrderBook(Win):
                             abin[4] = book.last_change_volume
                             break
 
-            # now finally paint the asks
             for pos, price, vol, ownvol, changevol in bins:
-                paint_row(pos, price, vol, ownvol, col_ask, changevol)
+                rows[pos] = (price, vol, ownvol, col_ask, changevol)
 
         #
         #
         # paint the bids (first we put them into bins[] then we paint them)
         #
         if len(book.bids):
-            i = 0
             bins = []
             pos = mid + 1
             vol = 0
@@ -463,19 +570,13 @@ class WinOrderBook(Win):
 
             # no grouping, bins can be created in one simple and fast loop
             if group == 1:
-                cnt = len(book.bids)
-                while pos < self.height and i < cnt:
-                    level = book.bids[i]
-                    price = level.price
+                for level in itertools.islice(book.bids, 0, max(self.height - pos, 0)):
                     if sum_total:
                         vol += level.volume
                     else:
                         vol = level.volume
-                    ownvol = level.own_volume
-                    bins.append([pos, price, vol, ownvol, 0])
-                    prev_vol = vol
+                    bins.append([pos, level.price, vol, level.own_volume, 0])
                     pos += 1
-                    i += 1
 
             # with gouping its a bit more complicated
             else:
@@ -504,16 +605,13 @@ class WinOrderBook(Win):
                     bin_price -= group
 
                 # now add the own volumes to their bins
-                for order in book.owns:
-                    if order.typ == "bid" and order.price > 0:
-                        order_bin_price = int(math.floor(float(order.price) / group) * group)
-                        for abin in bins:
-                            if abin[1] == order.price:
-                                abin[3] += order.volume
-                                break
-                            if abin[1] == order_bin_price:
-                                abin[3] += order.volume
-                                break
+                bin_index = dict((abin[1], abin) for abin in bins)
+                for price, volume in own_vols["bid"].items():
+                    abin = bin_index.get(price)
+                    if not abin:
+                        abin = bin_index.get(int(math.floor(float(price) / group) * group))
+                    if abin:
+                        abin[3] += volume
 
             # mark the level where change took place (optional)
             if gox.config.get_bool("goxtool", "highlight_changes"):
@@ -527,9 +625,21 @@ class WinOrderBook(Win):
                             abin[4] = book.last_change_volume
                             break
 
-            # now finally paint the bids
             for pos, price, vol, ownvol, changevol in bins:
-                paint_row(pos, price, vol, ownvol, col_bid, changevol)
+                rows[pos] = (price, vol, ownvol, col_bid, changevol)
+
+        #
+        #
+        # now finally paint the rows, but only those that have changed
+        #
+        for pos in self.row_cache:
+            if not pos in rows:
+                self.win.move(pos, 0)
+                self.win.clrtoeol()
+        for pos, row in rows.items():
+            if self.row_cache.get(pos) != row:
+                paint_row(pos, *row)
+        self.row_cache = rows
 
         # update the xterm title bar
         if self.gox.config.get_bool("goxtool", "set_xterm_title"):
@@ -540,16 +650,19 @@ class WinOrderBook(Win):
                 title += " bid:" + self.gox.quote2str(book.bid).strip()
                 title += " ask:" + self.gox.quote2str(book.ask).strip()
 
-                term = os.environ["TERM"]
-                # the following is incomplete but better safe than sorry
-                # if you know more terminals then please provide a patch
-                if "xterm" in term or "rxvt" in term:
-                    sys_out.write("\x1b]0;%s\x07" % title)
-                    sys_out.flush()
+                # most orderbook changes don't change the title at all
+                if title != self.last_title:
+                    self.last_title = title
+                    term = os.environ["TERM"]
+                    # the following is incomplete but better safe than sorry
+                    # if you know more terminals then please provide a patch
+                    if "xterm" in term or "rxvt" in term:
+                        sys_out.write("\x1b]0;%s\x07" % title)
+                        sys_out.flush()
 
     def slot_changed(self, _book, _dummy):
         """Slot for orderbook.signal_changed"""
-        self.do_paint()
+        self.mark_dirty()
 
 
 TYPE_HISTORY = 1
@@ -562,7 +675,10 @@ class WinChart(Win):
         self.gox = gox
         self.pmin = 0
         self.pmax = 0
+        self.yscale = 0
         self.change_type = None
+        self.history_sig = None # what the history chart showed last time
+        self.depth_label_cache = {} # (format, price) -> depth chart label
         gox.history.signal_changed.connect(self.slot_history_changed)
         gox.orderbook.signal_changed.connect(self.slot_orderbook_changed)
 
@@ -575,8 +691,19 @@ class WinChart(Win):
             self.body_char = curses.ACS_CKBOARD # pylint: disable=E1101
             self.body_attr = 0
 
+        # attributes used by paint_candle(), colors won't change at runtime
+        self.attr_wick = COLOR_PAIR["chart_text"]
+        self.attr_body_up = self.body_attr + COLOR_PAIR["chart_up"]
+        self.attr_body_down = self.body_attr + COLOR_PAIR["chart_down"]
+
         Win.__init__(self, stdscr)
 
+    def resize(self):
+        """the new window will be empty, it needs a full paint"""
+        self.change_type = None
+        self.history_sig = None
+        Win.resize(self)
+
     def calc_size(self):
         """position in the middle, right to the orderbook"""
         self.posx = WIDTH_ORDERBOOK
@@ -594,7 +721,15 @@ class WinChart(Win):
         if self.pmax <= self.pmin:
             return None
         stepex = float(self.pmax - self.pmin) / num_min
-        step1 = math.pow(10, math.floor(math.log(stepex, 10)))
+
+        # largest power of 10 not above stepex. Count the decades instead
+        # of using log(), this is cheaper and has no rounding problems at
+        # exact powers of 10 (math.log(1000, 10) is 2.9999999999999996)
+        step1 = 1.0
+        while step1 * 10 <= stepex:
+            step1 *= 10
+        while step1 > stepex:
+            step1 /= 10
         step2 = step1 * 2
         step5 = step1 * 5
         if step5 <= stepex:
@@ -605,23 +740,19 @@ class WinChart(Win):
 
     def price_to_screen(self, price):
         """convert price into screen coordinates (y=0 is at the top!)"""
-        relative_from_bottom = \
-            float(price - self.pmin) / float(self.pmax - self.pmin)
-        screen_from_bottom = relative_from_bottom * self.height
-        return int(self.height - screen_from_bottom)
+        return int(self.height - (price - self.pmin) * self.yscale)
 
-    def paint_y_label(self, posy, posx, price):
+    def paint_y_label(self, posy, posx, price, need_digits):
         """paint the y label of the history chart, formats the number
         so that it needs not more room than necessary but it also uses
-        pmax to determine how many digits are needed so that all numbers
+        need_digits (the number of digits of pmax) so that all numbers
         will be nicely aligned at the decimal point"""
 
         fprice = self.gox.quote2float(price)
         labelstr = ("%f" % fprice).rstrip("0").rstrip(".")
 
-        # look at pmax to determine the max number of digits before the decimal
-        # and then pad all smaller prices with spaces to make them align nicely.
-        need_digits = int(math.log10(self.gox.quote2float(self.pmax))) + 1
+        # pad all prices that have less digits than pmax before the
+        # decimal point with spaces to make them align nicely.
         have_digits = len(str(int(fprice)))
         if have_digits < need_digits:
             padding = " " * (need_digits - have_digits)
@@ -636,26 +767,40 @@ class WinChart(Win):
     def paint_candle(self, posx, candle):
         """paint a single candle"""
 
-        sopen  = self.price_to_screen(candle.opn)
-        shigh  = self.price_to_screen(candle.hig)
-        slow   = self.price_to_screen(candle.low)
-        sclose = self.price_to_screen(candle.cls)
-
-        for posy in range(self.height):
-            if posy >= shigh and posy < sopen and posy < sclose:
-                # upper wick
-                # pylint: disable=E1101
-                self.addch(posy, posx, curses.ACS_VLINE, COLOR_PAIR["chart_text"])
-            if posy >= sopen and posy < sclose:
-                # red body
-                self.addch(posy, posx, self.body_char, self.body_attr + COLOR_PAIR["chart_down"])
-            if posy >= sclose and posy < sopen:
-                # green body
-                self.addch(posy, posx, self.body_char, self.body_attr + COLOR_PAIR["chart_up"])
-            if posy >= sopen and posy >= sclose and posy < slow:
-                # lower wick
-                # pylint: disable=E1101
-                self.addch(posy, posx, curses.ACS_VLINE, COLOR_PAIR["chart_text"])
+        if posx < 0 or posx > self.width - 1:
+            return
+
+        # same as price_to_screen() but inlined, this is called very often
+        # for every candle, so everything needed is pulled into locals first
+        height = self.height
+        pmin = self.pmin
+        yscale = self.yscale
+        vline = self.win.vline
+        sopen  = int(height - (candle.opn - pmin) * yscale)
+        shigh  = int(height - (candle.hig - pmin) * yscale)
+        slow   = int(height - (candle.low - pmin) * yscale)
+        sclose = int(height - (candle.cls - pmin) * yscale)
+
+        # the wick goes from high to low in one single vline() call and
+        # then the body is painted over it with a second one, overdrawing
+        # a few cells in C is cheaper than a third call from python.
+        # Both are clipped to the window height.
+        top = max(shigh, 0)
+        bottom = min(slow, height)
+        if bottom > top:
+            # pylint: disable=E1101
+            vline(top, posx, curses.ACS_VLINE, bottom - top, self.attr_wick)
+
+        if sopen < sclose:
+            top = max(sopen, 0)
+            bottom = min(sclose, height)
+            body_attr = self.attr_body_down
+        else:
+            top = max(sclose, 0)
+            bottom = min(sopen, height)
+            body_attr = self.attr_body_up
+        if bottom > top:
+            vline(top, posx, self.body_char, bottom - top, body_attr)
 
     def paint(self):
         typ = self.gox.config.get_string("goxtool", "display_right")
@@ -663,8 +808,10 @@ class WinChart(Win):
             self.paint_history_chart()
         elif typ == "depth_chart":
             self.paint_depth_chart()
+            self.history_sig = None
         else:
             self.paint_history_chart()
+        self.change_type = None
 
     def paint_depth_chart(self):
         """paint a depth chart"""
@@ -685,7 +832,14 @@ class WinChart(Win):
                 col = col_ask + curses.A_BOLD
             else:
                 col = col_bar
-            pricestr = FORMAT_STRING % self.gox.quote2float(price)
+            key = (FORMAT_STRING, price)
+            try:
+                pricestr = label_cache[key]
+            except KeyError:
+                if len(label_cache) > goxapi.STR_CACHE_SIZE:
+                    label_cache.clear()
+                pricestr = FORMAT_STRING % self.gox.quote2float(price)
+                label_cache[key] = pricestr
             self.addstr(pos, 0, pricestr, col_price)
             length = int(vol * mult_x)
             # pylint: disable=E1101
@@ -705,6 +859,7 @@ class WinChart(Win):
         col_bid = COLOR_PAIR["book_bid"]
         col_ask = COLOR_PAIR["book_ask"]
         col_own = COLOR_PAIR["book_own"]
+        label_cache = self.depth_label_cache
 
         group = self.gox.config.get_float("goxtool", "depth_chart_group")
         if group == 0:
@@ -809,65 +964,73 @@ class WinChart(Win):
     def paint_history_chart(self):
         """paint a history candlestick chart"""
 
-        if self.change_type == TYPE_ORDERBOOK:
+        hist = self.gox.history
+        book = self.gox.orderbook
+
+        # We won't paint the candlestick chart if it was triggered from an
+        # orderbook change signal because that would be redundant and only
+        # waste CPU. The same is true if the history has changed but none
+        # of the visible candles did (for example volume only changes).
+        # In that case we only repaint the bid/ask markers (see below).
+        # The y range only depends on the candles, so after an orderbook
+        # change the range of the last full paint is still valid.
+        if self.change_type == TYPE_ORDERBOOK and self.history_sig:
+            need_full_paint = False
+        else:
+            # determine y range, one candle per column, rightmost column
+            # is reserved for the bid/ask and order markers
+            visible = list(itertools.islice(hist.candles, max(self.width - 1, 0)))
+            if visible:
+                self.pmax = max(candle.hig for candle in visible)
+                self.pmin = min(candle.low for candle in visible)
+
+            if not visible or self.pmax == self.pmin:
+                self.win.bkgd(" ",  COLOR_PAIR["chart_text"])
+                self.win.erase()
+                self.history_sig = None
+                return
+
+            # screen rows per price unit, used by price_to_screen()
+            self.yscale = float(self.height) / (self.pmax - self.pmin)
+
+            sig = (self.width, self.height, self.pmin, self.pmax, tuple(
+                (c.opn, c.hig, c.low, c.cls) for c in visible))
+            need_full_paint = sig != self.history_sig
+            self.history_sig = sig
+
+        price_to_screen = self.price_to_screen
+
+        if not need_full_paint:
             # erase only the rightmost column to redraw bid/ask and orders
-            # beause we won't redraw the chart, its only an orderbook change
             self.win.vline(0, self.width - 1, " ", self.height, COLOR_PAIR["chart_text"])
         else:
             self.win.bkgd(" ",  COLOR_PAIR["chart_text"])
             self.win.erase()
 
-        hist = self.gox.history
-        book = self.gox.orderbook
-
-        self.pmax = 0
-        self.pmin = 9999999999
-
-        # determine y range
-        posx = self.width - 2
-        index = 0
-        while index < hist.length() and posx >= 0:
-            candle = hist.candles[index]
-            if self.pmax < candle.hig:
-                self.pmax = candle.hig
-            if self.pmin > candle.low:
-                self.pmin = candle.low
-            index += 1
-            posx -= 1
-
-        if self.pmax == self.pmin:
-            return
-
-        # paint the candlestick chart.
-        # We won't paint it if it was triggered from an orderbook change
-        # signal because that would be redundant and only waste CPU.
-        # In that case we only repaint the bid/ask markers (see below)
-        if self.change_type != TYPE_ORDERBOOK:
             # paint the candles
+            paint_candle = self.paint_candle
             posx = self.width - 2
-            index = 0
-            while index < hist.length() and posx >= 0:
-                candle = hist.candles[index]
-                self.paint_candle(posx, candle)
-                index += 1
+            for candle in visible:
+                paint_candle(posx, candle)
                 posx -= 1
 
             # paint the y-axis labels
             posx = 0
             step = self.get_optimal_step(4)
             if step:
-                labelprice = int(self.pmin / step) * step
-                while not labelprice > self.pmax:
-                    posy = self.price_to_screen(labelprice)
+                need_digits = int(math.log10(self.gox.quote2float(self.pmax))) + 1
+                start = int(self.pmin / step) * step
+                count = int((self.pmax - start) / step) + 1
+                for labelprice in [start + i * step for i in range(count)]:
+                    posy = price_to_screen(labelprice)
                     if posy < self.height - 1:
-                        self.paint_y_label(posy, posx, labelprice)
-                    labelprice += step
+                        self.paint_y_label(posy, posx, labelprice, need_digits)
 
         # paint bid, ask, own orders
         posx = self.width - 1
         for order in book.owns:
             if self.is_in_range(order.price):
-                posy = self.price_to_screen(order.price)
+                posy = price_to_screen(order.price)
                 if order.status == "pending":
                     self.addch(posy, posx,
                         ord("p"), COLOR_PAIR["order_pending"])
@@ -876,13 +1039,13 @@ class WinChart(Win):
                         ord("o"), COLOR_PAIR["book_own"])
 
         if self.is_in_range(book.bid):
-            posy = self.price_to_screen(book.bid)
+            posy = price_to_screen(book.bid)
             # pylint: disable=E1101
             self.addch(posy, posx,
                 curses.ACS_HLINE, COLOR_PAIR["chart_up"])
 
         if self.is_in_range(book.ask):
-            posy = self.price_to_screen(book.ask)
+            posy = price_to_screen(book.ask)
             # pylint: disable=E1101
             self.addch(posy, posx,
                 curses.ACS_HLINE, COLOR_PAIR["chart_down"])
@@ -891,14 +1054,15 @@ class WinChart(Win):
     def slot_history_changed(self, _sender, _data):
         """Slot for history changed"""
         self.change_type = TYPE_HISTORY
-        self.do_paint()
-        self.change_type = None
+        self.mark_dirty()
 
     def slot_orderbook_changed(self, _sender, _data):
         """Slot for orderbook changed"""
-        self.change_type = TYPE_ORDERBOOK
-        self.do_paint()
-        self.change_type = None
+        # if the history has also changed since
+        # the last paint we still need a full paint
+        if self.change_type != TYPE_HISTORY:
+            self.change_type = TYPE_ORDERBOOK
+        self.mark_dirty()
 
 
 class WinStatus(Win):
@@ -948,17 +1112,14 @@ class WinStatus(Win):
         #
         # first line
         #
-        line1 = "Market: %s%s | " % (cbase, cquote)
-        line1 += "Account: "
         if len(self.sorted_currency_list):
-            for currency in self.sorted_currency_list:
-                if currency in self.gox.wallet:
-                    line1 += currency + " " \
-                    + goxapi.int2str(self.gox.wallet[currency], currency).strip() \
-                    + " + "
-            line1 = line1.strip(" +")
+            wallet = self.gox.wallet
+            account = " + ".join(
+                "%s %s" % (currency, goxapi.int2str(wallet[currency], currency).strip())
+                for currency in self.sorted_currency_list if currency in wallet)
         else:
-            line1 += "No info (yet)"
+            account = "No info (yet)"
+        line1 = "Market: %s%s | Account: %s" % (cbase, cquote, account)
 
         #
         # second line
@@ -985,13 +1146,13 @@ class WinStatus(Win):
 
     def slot_changed(self, dummy_sender, dummy_data):
         """the callback funtion called by the Gox() instance"""
-        self.do_paint()
+        self.mark_dirty()
 
     def slot_orderlag(self, dummy_sender, (usec, text)):
         """slot for order_lag mesages"""
         self.order_lag = usec
         self.order_lag_txt = text
-        self.do_paint()
+        self.mark_dirty()
 
 
 class DlgListItems(Win):
@@ -1076,9 +1237,11 @@ class DlgListItems(Win):
     def modal(self):
         """run the modal getch-loop for this dialog"""
         if self.win:
+            self.win.timeout(int(FRAME_INTERVAL * 1000))
             done = False
             while not done:
                 key_pressed = self.win.getch()
+                paint_dirty_windows()
                 if key_pressed in [27, ord("q"), curses.KEY_F10]:
                     done = True
                 if key_pressed == curses.KEY_DOWN:
@@ -1157,10 +1320,10 @@ class TextBox():
         self.dlg = dlg
         self.win = dlg.win.derwin(1, length, posy, posx)
         self.win.keypad(1)
+        self.win.timeout(int(FRAME_INTERVAL * 1000))
         self.box = curses.textpad.Textbox(self.win, insert_mode=True)
         self.value = ""
         self.result = None
-        self.editing = False
 
     def __del__(self):
         self.box = None
@@ -1169,16 +1332,24 @@ class TextBox():
     def modal(self):
         """enter te edit box modal loop"""
         self.win.move(0, 0)
-        self.editing = True
-        goxapi.start_thread(self.cursor_placement_thread, "TextBox cursor placement")
+        curses.curs_set(2)
         self.value = self.box.edit(self.validator)
-        self.editing = False
+        curses.curs_set(0)
         return self.result
 
     def validator(self, char):
         """here we tweak the behavior slightly, especially we want to
         end modal editing mode immediately on arrow up/down and on enter
         and we also want to catch ESC and F10, to abort the entire dialog"""
+        if char == -1:
+            # getch() timed out, keep the windows below the dialog updated.
+            # Repainting them hides the cursor and leaves it somewhere
+            # else, so put it back into the edit field afterwards
+            if paint_dirty_windows():
+                curses.curs_set(2)
+                self.win.touchwin()
+                self.win.refresh()
+            return 0
         if curses.ascii.isprint(char):
             return char
         if char == curses.ascii.TAB:
@@ -1194,22 +1365,6 @@ class TextBox():
             return curses.ascii.BEL
         return char
 
-    def cursor_placement_thread(self):
-        """this is the most ugly hack of the entire program. During the
-        signals hat are fired while we are editing there will be many repaints
-        of other other panels below this dialog and when curses is done
-        repainting everything the blinking cursor is not in the correct
-        position. This is only a cosmetic problem but very annnoying. Try to
-        force it into the edit field by repainting it very often."""
-        while self.editing:
-            # pylint: disable=W0212
-            with goxapi.Signal._lock:
-                curses.curs_set(2)
-                self.win.touchwin()
-                self.win.refresh()
-            time.sleep(0.1)
-        curses.curs_set(0)
-
 
 class NumberBox(TextBox):
     """TextBox that only accepts numbers"""
@@ -1338,7 +1493,10 @@ class DlgNewOrderAsk(DlgNewOrder):
 #
 
 class LogWriter():
-    """connects to gox.signal_debug and logs it all to the logfile"""
+    """connects to gox.signal_debug and logs it all to the logfile. The
+    slot only puts the log records into a queue, they are written to the
+    file by a separate thread, so the threads emitting debug signals (the
+    websocket receive thread for example) will never wait for disk I/O"""
     def __init__(self, gox):
         self.gox = gox
         if self.gox.config.get_bool("goxtool", "dont_truncate_logfile"):
@@ -1351,18 +1509,30 @@ class LogWriter():
                            ,format='%(asctime)s:%(levelname)s:%(message)s'
                            ,level=logging.DEBUG
                            )
+        self.logger = logging.getLogger()
+        self.queue = Queue.Queue()
+        self.thread = goxapi.start_thread(self.writer_thread, "log writer")
         self.gox.signal_debug.connect(self.slot_debug)
 
     def close(self):
-        """stop logging"""
-        #not needed
-        pass
+        """stop logging, write all remaining records before returning"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def writer_thread(self):
+        """write the queued log records to the file until None is received"""
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            self.logger.handle(record)
 
-    # pylint: disable=R0201
     def slot_debug(self, sender, (msg)):
         """handler for signal_debug signals"""
         name = "%s.%s" % (sender.__class__.__module__, sender.__class__.__name__)
-        logging.debug("%s:%s", name, msg)
+        record = self.logger.makeRecord(
+            self.logger.name, logging.DEBUG, "", 0, "%s:%s", (name, msg), None)
+        self.queue.put(record)
 
 
 class PrintHook():
@@ -1503,6 +1673,9 @@ def main():
         # we can print them.
         try:
             init_colors()
+            sync = config.get_string("goxtool", "sync_output")
+            Win.sync_output = sync == "True" or \
+                (sync == "auto" and terminal_has_sync_output())
             gox = goxapi.Gox(secret, config)
 
             logwriter = LogWriter(gox)
@@ -1516,9 +1689,15 @@ def main():
             strategy_manager = StrategyManager(gox, strat_mod_list)
 
             gox.start()
+            stdscr.timeout(int(FRAME_INTERVAL * 1000))
+            getch = stdscr.getch
             while True:
-                key = stdscr.getch()
-                if key == ord("q"):
+                key = getch()
+                paint_dirty_windows()
+                if key == -1:
+                    # getch() timed out, nothing was pressed
+                    pass
+                elif key == ord("q"):
                     break
                 elif key == curses.KEY_F4:
                     DlgNewOrderBid(stdscr, gox).modal()
@@ -27,6 +27,13 @@ import socket
 import ssl
 import uuid
 
+# ujson is optional, it decodes the incoming messages a lot faster
+try:
+    import ujson  # pylint: disable=F0401
+    json_loads = ujson.loads  # pylint: disable=C0103
+except ImportError:
+    json_loads = json.loads  # pylint: disable=C0103
+
 class SocketClosedException(Exception):
     """raised when socket read fails. This normally happens when the
     hup() method is invoked, your thread that loops over read() should
@@ -88,7 +95,7 @@ class PubNub(): #pylint: disable=R0902
             if encoding == "gzip":
                 data = self._unzip(data)
 
-            data = json.loads(data)
+            data = json_loads(data)
             self.timestamp = int(data[1])
             if len(data[0]):
                 if self.cipher:
@@ -219,4 +226,4 @@ class PubNub(): #pylint: disable=R0902
         key = hashlib.sha256(self.cipher).hexdigest()[0:32]
         aes = AES.new(key, AES.MODE_CBC, "0123456789012345")
         decrypted = aes.decrypt(base64.decodestring(msg))
-        return json.loads(decrypted[0:-ord(decrypted[-1])])
+        return json_loads(decrypted[0:-ord(decrypted[-1])])
@@ -0,0 +1,312 @@
+"""tests for goxapi.py, run with python -m unittest test_goxapi"""
+
+# pylint: disable=C0111
+
+import BaseHTTPServer
+import httplib
+import json
+import os
+import shutil
+import socket
+import SocketServer
+import tempfile
+import threading
+import time
+import unittest
+
+import goxapi
+import websocket
+
+
+class RecordingHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """remember the headers and the body of every request. What happens
+    after that is taken from the actions list, one entry per request:
+    "ok" answers, "close" answers and then closes the connection without
+    announcing it, "drop" closes without answering and "hang" waits for
+    the event hang_until before it answers."""
+    protocol_version = "HTTP/1.1"
+    requests = []
+    actions = []
+    hang_until = threading.Event()
+
+    def do_GET(self): # pylint: disable=C0103
+        self.requests.append((dict(self.headers.items()), None))
+        self.answer()
+
+    def do_POST(self): # pylint: disable=C0103
+        length = int(self.headers.getheader("Content-Length", 0))
+        body = self.rfile.read(length)
+        self.requests.append((dict(self.headers.items()), body))
+        self.answer()
+
+    def answer(self):
+        action = self.actions.pop(0) if self.actions else "ok"
+        if action == "drop":
+            self.close_connection = 1
+            return
+        if action == "hang":
+            self.hang_until.wait(10)
+        reply = '{"result": "success"}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+        if action == "close":
+            self.close_connection = 1
+
+    def log_message(self, *_args):
+        pass
+
+
+class RecordingServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """the client keeps its connection open, serve each in its own thread"""
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """clients that gave up (timeout tests) are expected here"""
+        pass
+
+
+class HttpServerTestCase(unittest.TestCase):
+    """runs a RecordingServer on localhost for every test"""
+
+    def setUp(self):
+        RecordingHandler.requests = []
+        RecordingHandler.actions = []
+        RecordingHandler.hang_until.clear()
+        self.server = RecordingServer(("127.0.0.1", 0), RecordingHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:%d/api/2/money/info" % self.server.server_port
+
+    def tearDown(self):
+        RecordingHandler.hang_until.set()
+        self.server.shutdown()
+        self.server.server_close()
+        for conn in getattr(goxapi.HTTP_CONNECTIONS, "pool", {}).values():
+            conn.close()
+        goxapi.HTTP_CONNECTIONS.pool = {}
+
+
+class TestHttpRequest(HttpServerTestCase):
+
+    def test_post_is_form_encoded(self):
+        post = "nonce=1&foo=bar"
+        answer = goxapi.http_request(self.url, post, {"Rest-Key": "key"})
+        self.assertEqual(answer, '{"result": "success"}')
+        headers, body = RecordingHandler.requests[0]
+        self.assertEqual(headers["content-type"],
+            "application/x-www-form-urlencoded")
+        self.assertEqual(headers["rest-key"], "key")
+        self.assertEqual(body, post)
+
+    def test_connection_is_reused(self):
+        goxapi.http_request(self.url, "nonce=1")
+        goxapi.http_request(self.url, "nonce=2")
+        self.assertEqual(len(RecordingHandler.requests), 2)
+        self.assertEqual(len(goxapi.HTTP_CONNECTIONS.pool), 1)
+
+    def test_closed_connection_is_replaced(self):
+        RecordingHandler.actions = ["close", "ok"]
+        goxapi.http_request(self.url, "nonce=1")
+        time.sleep(0.1)
+        answer = goxapi.http_request(self.url, "nonce=2")
+        self.assertEqual(answer, '{"result": "success"}')
+        self.assertEqual(len(RecordingHandler.requests), 2)
+
+    def test_sent_post_is_not_repeated(self):
+        RecordingHandler.actions = ["ok", "drop"]
+        goxapi.http_request(self.url, "nonce=1")
+        self.assertRaises(httplib.HTTPException,
+            goxapi.http_request, self.url, "nonce=2")
+        self.assertEqual([body for _, body in RecordingHandler.requests],
+            ["nonce=1", "nonce=2"])
+
+    def test_unanswered_get_is_repeated(self):
+        RecordingHandler.actions = ["ok", "drop", "ok"]
+        goxapi.http_request(self.url)
+        answer = goxapi.http_request(self.url)
+        self.assertEqual(answer, '{"result": "success"}')
+        self.assertEqual(len(RecordingHandler.requests), 3)
+
+    def test_hanging_request_times_out(self):
+        RecordingHandler.actions = ["hang"]
+        timeout = goxapi.HTTP_TIMEOUT
+        goxapi.HTTP_TIMEOUT = 0.5
+        try:
+            self.assertRaises(socket.timeout, goxapi.http_request, self.url)
+        finally:
+            goxapi.HTTP_TIMEOUT = timeout
+
+
+class NoSecret:
+    def know_secret(self):
+        return False
+
+
+class TestDownloadQueue(HttpServerTestCase):
+
+    def setUp(self):
+        HttpServerTestCase.setUp(self)
+        self.tmpdir = tempfile.mkdtemp()
+        config = goxapi.GoxConfig(os.path.join(self.tmpdir, "goxtool.ini"))
+        config.set("gox", "use_ssl", "False")
+        self.client = goxapi.WebsocketClient("BTC", "USD", NoSecret(), config)
+        self.client._timer.cancel() # pylint: disable=W0212
+        self.client._ping_timer.cancel() # pylint: disable=W0212
+        self.fulldepth = threading.Event()
+        self.client.signal_fulldepth.connect(self.slot_fulldepth)
+        self.saved = (goxapi.HTTP_HOST, goxapi.HTTP_TIMEOUT)
+        goxapi.HTTP_HOST = "127.0.0.1:%d" % self.server.server_port
+        goxapi.HTTP_TIMEOUT = 0.5
+
+    def tearDown(self):
+        goxapi.HTTP_HOST, goxapi.HTTP_TIMEOUT = self.saved
+        self.client.download_requests.put(None)
+        HttpServerTestCase.tearDown(self)
+        shutil.rmtree(self.tmpdir)
+
+    def slot_fulldepth(self, _sender, _data):
+        self.fulldepth.set()
+
+    def test_hanging_download_does_not_block_the_queue(self):
+        RecordingHandler.actions = ["hang", "ok"]
+        self.client.request_fulldepth()
+        self.client.request_fulldepth()
+        goxapi.start_thread(self.client._download_thread_func) # pylint: disable=W0212
+        self.fulldepth.wait(5)
+        self.assertTrue(self.fulldepth.is_set())
+        self.assertEqual(len(RecordingHandler.requests), 2)
+
+
+class SocketPairWebSocket(websocket.WebSocket):
+    """a WebSocket that is connected to the other end of a socketpair
+    instead of a server, the test plays the server on that other end"""
+    peers = []
+
+    def connect(self, url, **options):
+        self.io_sock = self.sock = self.peers[-1][0]
+        self.connected = True
+
+
+def server_frame(opcode, payload=""):
+    """a short unmasked frame, as the server would send it"""
+    return chr(0x80 | opcode) + chr(len(payload)) + payload
+
+
+class TestWebsocketRecv(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        config = goxapi.GoxConfig(os.path.join(self.tmpdir, "goxtool.ini"))
+        self.client = goxapi.WebsocketClient("BTC", "USD", NoSecret(), config)
+        # pylint: disable=W0212
+        for timer in [self.client._timer, self.client._ping_timer]:
+            thread = timer._timer
+            timer.cancel()
+            thread.join()
+        ours, self.peer = socket.socketpair()
+        SocketPairWebSocket.peers.append((ours, self.peer))
+        self.saved = goxapi.websocket.WebSocket
+        goxapi.websocket.WebSocket = SocketPairWebSocket
+        self.thread = goxapi.start_thread(self.client._recv_thread_func)
+        for _ in range(100):
+            if self.client.connected:
+                break
+            time.sleep(0.01)
+        self.assertTrue(self.client.connected)
+
+    def tearDown(self):
+        goxapi.websocket.WebSocket = self.saved
+        self.client._terminating = True # pylint: disable=W0212
+        self.peer.close()
+        self.thread.join(5)
+        shutil.rmtree(self.tmpdir)
+
+    def test_pong_counts_as_activity(self):
+        before = self.client._time_last_received # pylint: disable=W0212
+        time.sleep(0.05)
+        self.peer.sendall(server_frame(websocket.ABNF.OPCODE_PONG))
+        for _ in range(100):
+            if self.client._time_last_received > before: # pylint: disable=W0212
+                break
+            time.sleep(0.01)
+        self.assertTrue(self.client._time_last_received > before) # pylint: disable=W0212
+
+    def test_text_is_queued_and_ping_answered(self):
+        self.peer.sendall(server_frame(websocket.ABNF.OPCODE_PING, "x"))
+        self.peer.sendall(server_frame(websocket.ABNF.OPCODE_TEXT, '{"op": "x"}'))
+        self.assertEqual(self.client.recv_queue.get(True, 5), '{"op": "x"}')
+        received = ""
+        self.peer.settimeout(5)
+        while chr(0x80 | websocket.ABNF.OPCODE_PONG) not in received:
+            received += self.peer.recv(4096)
+
+
+class TestSignal(unittest.TestCase):
+
+    def test_connect_after_send(self):
+        received = []
+        def first(_sender, data):
+            received.append(("first", data))
+        def second(_sender, data):
+            received.append(("second", data))
+        signal = goxapi.Signal()
+        signal.connect(first)
+        signal(None, 1) # builds the cached slot list
+        signal.connect(second)
+        signal(None, 2)
+        self.assertEqual(sorted(received),
+            [("first", 1), ("first", 2), ("second", 2)])
+
+
+class TestSlotRecv(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        config = goxapi.GoxConfig(os.path.join(self.tmpdir, "goxtool.ini"))
+        self.gox = goxapi.Gox(NoSecret(), config)
+        self.trades = []
+        self.gox.signal_trade.connect(self.slot_trade)
+
+    def tearDown(self):
+        # pylint: disable=W0212
+        for timer in [self.gox.client._timer, self.gox.timer_poll]:
+            thread = timer._timer
+            timer.cancel()
+            thread.join()
+        shutil.rmtree(self.tmpdir)
+
+    def slot_trade(self, _sender, data):
+        self.trades.append(data)
+
+    def trade(self, currency, stamp):
+        return json.dumps({
+            "op": "private",
+            "private": "trade",
+            "channel": goxapi.CHANNELS["trade.BTC"],
+            "stamp": str(stamp),
+            "trade": {
+                "price_currency": currency,
+                "item": "BTC",
+                "date": "1364000000",
+                "price_int": "10000000",
+                "amount_int": "100000000",
+                "trade_type": "bid"
+            }
+        })
+
+    def test_foreign_trade_is_dropped(self):
+        stamp = int(time.time() * 1e6) - 3000000
+        self.gox.slot_recv(None, self.trade("EUR", stamp))
+        self.assertEqual(self.trades, [])
+        self.assertTrue(self.gox.socket_lag > 0)
+
+    def test_own_currency_trade_is_processed(self):
+        self.gox.slot_recv(None, self.trade("USD", int(time.time() * 1e6)))
+        self.assertEqual(len(self.trades), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -76,6 +76,10 @@ class WebSocketConnectionClosedException(WebSocketException):
 default_timeout = None
 traceEnabled = False
 
+# read at least this many bytes from the socket at once, frames are then
+# taken from the buffer instead of doing several small reads per frame.
+recv_chunk_size = 16384
+
 
 def enableTrace(tracable):
     """
@@ -358,6 +362,7 @@ class WebSocket(object):
         self.connected = False
         self.io_sock = self.sock = socket.socket()
         self.get_mask_key = get_mask_key
+        self._recv_buffer = ""
 
     def set_mask_key(self, func):
         """
@@ -652,6 +657,7 @@ class WebSocket(object):
         self.connected = False
         self.sock.close()
         self.io_sock = self.sock
+        self._recv_buffer = ""
 
     def _recv(self, bufsize):
         bytes = self.io_sock.recv(bufsize)
@@ -660,13 +666,18 @@ class WebSocket(object):
         return bytes
 
     def _recv_strict(self, bufsize):
-        remaining = bufsize
-        bytes = ""
-        while remaining:
-            bytes += self._recv(remaining)
-            remaining = bufsize - len(bytes)
-
-        return bytes
+        buf = self._recv_buffer
+        if len(buf) < bufsize:
+            chunks = [buf]
+            have = len(buf)
+            while have < bufsize:
+                bytes = self._recv(max(bufsize - have, recv_chunk_size))
+                chunks.append(bytes)
+                have += len(bytes)
+            buf = "".join(chunks)
+
+        self._recv_buffer = buf[bufsize:]
+        return buf[:bufsize]
 
     def _recv_line(self):
         line = []